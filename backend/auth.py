@@ -1,11 +1,18 @@
+import os
+import time
+from collections import namedtuple
 from datetime import datetime, timedelta
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import inspect, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from backend.cache import TTLCache
 from backend.database import SessionLocal
+from backend.metrics import span
 from backend.models import User
 
 # ---------------- CONFIG ----------------
@@ -21,6 +28,19 @@ pwd_context = CryptContext(
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# Verified tokens and per-user token versions are kept in memory, so an
+# authenticated request normally costs two dict lookups: no JWT signature
+# check, no users query. Logout / password change bump users.token_version,
+# which kills every older token. Other workers notice within AUTH_CACHE_TTL.
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL = int(os.getenv("AUTH_CACHE_TTL", "300"))  # seconds
+
+token_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)  # token -> (CurrentUser, exp)
+version_cache = TTLCache(maxsize=AUTH_CACHE_SIZE, ttl=AUTH_CACHE_TTL)  # user id -> token_version
+
+# What the routes get from the auth dependency (they only need the id)
+CurrentUser = namedtuple("CurrentUser", ["id", "username", "ver"])
+
 # ---------------- PASSWORD UTILS ----------------
 
 def hash_password(password: str) -> str:
@@ -34,55 +54,82 @@ def verify_password(plain: str, hashed: str) -> bool:
 
 # ---------------- JWT ----------------
 
+def create_user_token(user: User):
+    return create_access_token({"sub": user.username, "uid": user.id, "ver": user.token_version or 0})
+
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-# ---------------- DB DEP ----------------
-
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
 # ---------------- AUTH DEP ----------------
 
-def get_current_user_db(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-):
-    credentials_exception = HTTPException(
+def _credentials_exception():
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Invalid authentication",
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+async def _decode(token: str):
+    """CurrentUser + expiry from a valid token. Tokens from before uid/ver claims cost one lookup by username."""
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
     except JWTError:
-        raise credentials_exception
-
-    user = db.query(User).filter(User.username == username).first()
-    if user is None:
-        raise credentials_exception
-
-    return user
+        raise _credentials_exception()
+    username = payload.get("sub")
+    if username is None:
+        raise _credentials_exception()
+    uid = payload.get("uid")
+    if uid is None:
+        async with SessionLocal() as db:
+            user = await db.scalar(select(User).where(User.username == username))
+        if user is None:
+            raise _credentials_exception()
+        uid = user.id
+        version_cache.set(uid, user.token_version or 0)
+    return CurrentUser(uid, username, payload.get("ver", 0)), payload["exp"]
+
+async def _token_version(uid: int):
+    version = version_cache.get(uid)
+    if version is None:
+        async with SessionLocal() as db:
+            user = await db.get(User, uid)
+        if user is None:
+            return None
+        version = user.token_version or 0
+        version_cache.set(uid, version)
+    return version
+
+async def get_current_user_db(token: str = Depends(oauth2_scheme)):
+    with span("auth"):
+        cached = token_cache.get(token)
+        if cached is None:
+            cached = await _decode(token)
+            token_cache.set(token, cached)
+        user, exp = cached
+        # jwt.decode checked exp once; cached entries are re-checked here
+        if exp < time.time() or await _token_version(user.id) != user.ver:
+            token_cache.pop(token)
+            raise _credentials_exception()
+        return user
+
+def revoke_tokens(user: User):
+    """Invalidates every token issued to `user` so far. Caller commits."""
+    user.token_version = (user.token_version or 0) + 1
+    version_cache.set(user.id, user.token_version)
 
 # ---------------- LOGIN ----------------
 
-def login_user(form_data, db: Session):
-    user = db.query(User).filter(
+async def login_user(form_data, db: AsyncSession):
+    user = await db.scalar(select(User).where(
         User.username == form_data.username
-    ).first()
+    ))
 
-    if not user or not verify_password(
+    # bcrypt is deliberately slow: keep it off the event loop
+    if not user or not await run_in_threadpool(
+        verify_password,
         form_data.password,
         user.hashed_password
     ):
@@ -91,5 +138,35 @@ def login_user(form_data, db: Session):
             detail="Invalid credentials",
         )
 
-    token = create_access_token({"sub": user.username})
+    token = create_user_token(user)
     return {"access_token": token, "token_type": "bearer"}
+
+# ---------------- LOGOUT / PASSWORD ----------------
+
+async def logout_user(current: CurrentUser, db: AsyncSession):
+    user = await db.get(User, current.id)
+    if user is not None:
+        revoke_tokens(user)
+        await db.commit()
+    return {"status": "logged_out"}
+
+async def change_password(current: CurrentUser, old_password: str, new_password: str, db: AsyncSession):
+    user = await db.get(User, current.id)
+    if user is None or not await run_in_threadpool(verify_password, old_password, user.hashed_password):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid credentials",
+        )
+    user.hashed_password = await run_in_threadpool(hash_password, new_password)
+    revoke_tokens(user)  # other sessions are logged out
+    await db.commit()
+    return {"access_token": create_user_token(user), "token_type": "bearer"}
+
+# ---------------- MIGRATION ----------------
+
+def migrate(conn):
+    """Adds users.token_version to databases created before token revocation. Run via conn.run_sync."""
+    insp = inspect(conn)
+    if not insp.has_table("users"): return
+    if "token_version" in {c["name"] for c in insp.get_columns("users")}: return
+    conn.execute(text("ALTER TABLE users ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0"))
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import time
+from collections import deque
+from backend.embedder import get_embedder
+
+# --- CONFIGURATION ---
+EMBED_MAX_BATCH = int(os.getenv("EMBED_MAX_BATCH", "32"))
+EMBED_MAX_WAIT_MS = float(os.getenv("EMBED_MAX_WAIT_MS", "5"))
+
+_batcher = None
+
+
+class EmbeddingBatcher:
+    """Coalesces concurrent single-text embedding requests into batched calls.
+
+    A batch is sent when `max_batch` texts are waiting or `max_wait_ms` after
+    the first one arrived, whichever comes first. Every caller gets back its
+    own vector (or `None`), exactly as if it had called the embedder alone.
+    """
+
+    def __init__(self, embedder, max_batch=EMBED_MAX_BATCH, max_wait_ms=EMBED_MAX_WAIT_MS):
+        self.embedder = embedder
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.batches = 0
+        self.items = 0
+        self.recent = deque(maxlen=100)  # (batch_size, unique_texts, ms) per batch
+        self._pending = []
+        self._timer = None
+        self._tasks = set()
+
+    async def embed(self, text):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.max_batch], self._pending[self.max_batch:]
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        # Identical texts in one window share a single slot in the upstream call
+        unique = list(dict.fromkeys(text for text, _ in batch))
+        start = time.perf_counter()
+        try:
+            vectors = dict(zip(unique, await self.embedder.aembed(unique)))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done(): future.set_exception(e)
+            return
+        finally:
+            self.batches += 1
+            self.items += len(batch)
+            self.recent.append((len(batch), len(unique), round((time.perf_counter() - start) * 1000, 2)))
+        for text, future in batch:
+            if not future.done(): future.set_result(vectors.get(text))
+
+    def stats(self):
+        recent = list(self.recent)
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+            "avg_batch_ms": round(sum(ms for _, _, ms in recent) / len(recent), 2) if recent else 0,
+            "last_batches": recent[-10:],
+        }
+
+
+def get_batcher():
+    global _batcher
+    if _batcher is None:
+        _batcher = EmbeddingBatcher(get_embedder())
+    return _batcher
@@ -0,0 +1,166 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+
+
+def normalize_text(text):
+    """Cache key for free-text queries: case- and whitespace-insensitive."""
+    return " ".join(str(text).lower().split())
+
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire `ttl` seconds after being set."""
+
+    def __init__(self, maxsize=1024, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            item = self._data.pop(key, None)
+        return default if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+class EmbeddingCache:
+    """Two-tier query embedding cache.
+
+    Tier 1 is an in-process TTLCache. Tier 2 is a SQLite file of float32
+    blobs keyed by (model, normalized text), so restarted or newly scaled
+    workers start warm. Pass `path=None` to run memory-only.
+
+    Disk reads run in a worker thread; writes are buffered and committed in
+    batches by `flush_loop`, which also prunes rows older than `ttl`.
+    """
+
+    def __init__(self, path, model, maxsize=10000, ttl=86400, flush_interval=2.0):
+        self.model = model
+        self.ttl = ttl
+        self.flush_interval = flush_interval
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.disk_hits = 0
+        self._db = None
+        self._lock = threading.Lock()  # one sqlite3 connection, shared by reader and flush threads
+        self._pending = []
+        self._last_prune = 0.0
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False, timeout=5)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                "model TEXT NOT NULL, key TEXT NOT NULL, vector BLOB NOT NULL, created REAL NOT NULL, "
+                "PRIMARY KEY (model, key)) WITHOUT ROWID"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS ix_embeddings_created ON embeddings (created)")
+            self._db.commit()
+
+    async def get(self, text):
+        key = normalize_text(text)
+        vector = self.memory.get(key)
+        if vector is not None or self._db is None:
+            return vector
+        blob = await asyncio.to_thread(self._read, key)
+        if blob is None:
+            return None
+        vector = array("f", blob).tolist()
+        self.memory.set(key, vector)
+        self.disk_hits += 1
+        return vector
+
+    def set(self, text, vector):
+        key = normalize_text(text)
+        self.memory.set(key, vector)
+        if self._db is not None:
+            self._pending.append((self.model, key, array("f", vector).tobytes(), time.time()))
+
+    def _read(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT vector FROM embeddings WHERE model = ? AND key = ? AND created > ?",
+                (self.model, key, time.time() - self.ttl),
+            ).fetchone()
+        return row[0] if row else None
+
+    def flush(self):
+        """Commit buffered writes in one transaction; prune expired rows at most every ttl / 24."""
+        if self._db is None:
+            return
+        rows, self._pending = self._pending, []
+        now = time.time()
+        prune = now - self._last_prune > self.ttl / 24
+        if not rows and not prune:
+            return
+        with self._lock:
+            if rows:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO embeddings (model, key, vector, created) VALUES (?, ?, ?, ?)", rows
+                )
+            if prune:
+                self._db.execute("DELETE FROM embeddings WHERE created <= ?", (now - self.ttl,))
+                self._last_prune = now
+            self._db.commit()
+
+    async def flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Embedding cache flush failed: {e}")
+
+    def close(self):
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    def stats(self):
+        # memory.misses counts every tier-1 miss, including those served from disk
+        return {
+            "memory_hits": self.memory.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.memory.misses - self.disk_hits,
+            "size": len(self.memory),
+            "pending_writes": len(self._pending),
+        }
@@ -0,0 +1,37 @@
+from typing import Optional, Union
+from fastapi import HTTPException
+from pydantic import BaseModel, ConfigDict
+from backend.catalog import STANDARD_COLUMNS
+
+# What a result tile can carry. Qdrant is only asked for these payload keys,
+# so extra CSV columns and ingest bookkeeping (content_hash) never reach the
+# wire; `?fields=` trims a page further to what the client renders.
+
+CARD_PAYLOAD = STANDARD_COLUMNS
+CARD_FIELDS = ["id", *STANDARD_COLUMNS, "score"]
+
+class Card(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+
+    id: Union[str, int]
+    title: Optional[str] = None
+    description: Optional[str] = None
+    image: Optional[str] = None
+    rating: Optional[Union[float, str]] = None  # LLM tiles and seed data may carry "8.5/10"-style strings
+    year: Optional[Union[int, str]] = None
+    type: Optional[str] = None
+    genre: Optional[str] = None
+    score: Optional[int] = None
+
+def parse_fields(fields):
+    """`?fields=title,image` -> {"id", "title", "image"} (id is always kept); None = full cards."""
+    if not fields: return None
+    wanted = {f.strip() for f in fields.split(",") if f.strip()}
+    unknown = wanted - set(CARD_FIELDS)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"unknown fields: {', '.join(sorted(unknown))} (allowed: {', '.join(CARD_FIELDS)})")
+    return wanted | {"id"}
+
+def project(items, fields):
+    if fields is None: return items
+    return [{k: v for k, v in item.items() if k in fields} for item in items]
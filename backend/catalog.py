@@ -0,0 +1,97 @@
+import uuid
+import pandas as pd
+
+# Canonical payload columns every ingestion path fills in
+STANDARD_COLUMNS = ['title', 'description', 'image', 'rating', 'year', 'type', 'genre']
+
+# --- COLUMN MAPPING ---
+
+def find_col(df, candidates):
+    for col in candidates:
+        if col in df.columns: return col
+    return None
+
+def get_column_value(row, possible_names, default=""):
+    for name in possible_names:
+        for col in row.index:
+            if col.lower() == name.lower():
+                val = row[col]
+                if pd.isna(val) or val == "":
+                    return default
+                return val
+    return default
+
+def generate_id(title):
+    return str(uuid.uuid5(uuid.NAMESPACE_DNS, title.lower().strip()))
+
+def record_id(record):
+    """Point id of a prepared row: a remake or a same-named series keeps its own point."""
+    return generate_id(f"{record['title']}|{record.get('year') or ''}|{record.get('type') or ''}")
+
+def normalize_columns(df):
+    df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
+    return df
+
+def build_col_map(df):
+    col_map = {}
+
+    # Map standard columns
+    t_col = find_col(df, ['title', 'show_title', 'name', 'series_title'])
+    if t_col: col_map[t_col] = 'title'
+
+    d_col = find_col(df, ['description', 'synopsis', 'plot', 'summary', 'desc'])
+    if d_col: col_map[d_col] = 'description'
+
+    i_col = find_col(df, ['image', 'img_url', 'poster', 'cover', 'poster_link', 'picture'])
+    if i_col: col_map[i_col] = 'image'
+
+    r_col = find_col(df, ['rating', 'score', 'imdb_score', 'vote_average'])
+    if r_col: col_map[r_col] = 'rating'
+
+    y_col = find_col(df, ['year', 'release_year', 'date', 'aired'])
+    if y_col: col_map[y_col] = 'year'
+
+    # Important: Capture Genre to detect Docs/Anime
+    g_col = find_col(df, ['genre', 'listed_in', 'category', 'genres'])
+    if g_col: col_map[g_col] = 'genre'
+
+    ty_col = find_col(df, ['type', 'media_type', 'content_type'])
+    if ty_col: col_map[ty_col] = 'type'
+    return col_map
+
+# --- CLEANUP ---
+
+def prepare_frame(df, col_map):
+    """Renames to standard columns, fills gaps and corrects `type` from genre text (vectorized)."""
+    df = normalize_columns(df).rename(columns=col_map)
+
+    # Fill missing
+    for std_col in STANDARD_COLUMNS:
+        if std_col not in df.columns: df[std_col] = "N/A"
+    df = df.fillna("")
+
+    # [SMART LOGIC] Force correct types based on Genre text.
+    # Applied lowest priority first, so Documentary > Anime > Stand-Up.
+    genre_text = df['genre'].astype(str).str.lower()
+    real_type = df['type'].astype(str).str.strip().str.upper()
+    real_type = real_type.mask(genre_text.str.contains("stand-up", regex=False), "STAND-UP")
+    real_type = real_type.mask(genre_text.str.contains("anime", regex=False), "ANIME")
+    real_type = real_type.mask(genre_text.str.contains("doc", regex=False), "DOCUMENTARY")
+    df['type'] = real_type # Save the corrected type (uppercase: matched exactly by the `type` keyword index)
+
+    # Typed values for the `rating` (float) and `year` (integer) payload indexes
+    df['rating'] = pd.to_numeric(df['rating'], errors="coerce").fillna(0.0).astype(float)
+    years = df['year'].astype(str).str.extract(r"(\d{4})", expand=False)
+    df['year'] = pd.Series([int(y) if isinstance(y, str) else None for y in years], index=df.index, dtype=object)
+    return df
+
+def search_texts(df):
+    # Rich Text Embedding
+    return (
+        df['title'].astype(str) + " " + df['description'].astype(str) + " "
+        + df['genre'].astype(str) + " " + df['type'].astype(str)
+    )
+
+def search_text(record):
+    """Single-record twin of `search_texts`, for rows edited after preparation."""
+    return f"{record['title']} {record['description']} {record['genre']} {record['type']}"
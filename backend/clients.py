@@ -0,0 +1,79 @@
+import os
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+from qdrant_client import AsyncQdrantClient
+
+# --- CONFIGURATION ---
+load_dotenv()
+
+QDRANT_URL = os.environ.get("QDRANT_URL")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+QDRANT_PREFER_GRPC = os.getenv("QDRANT_PREFER_GRPC", "0") == "1"
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT", "10"))
+QDRANT_POOL_SIZE = int(os.getenv("QDRANT_POOL_SIZE", "20"))
+
+OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY")
+
+COLLECTION_NAME = "freeme_collection"
+
+# One set of clients per worker process. Each owns a keep-alive connection
+# pool, so requests reuse TLS sessions instead of handshaking every time.
+_qdrant = None
+_llm = None
+
+# --- QDRANT ---
+
+def _qdrant_url():
+    url = QDRANT_URL
+    if url and url.startswith("ttps://"): url = url.replace("ttps://", "https://")
+    return url
+
+def init_qdrant():
+    global _qdrant
+    if _qdrant is None:
+        _qdrant = AsyncQdrantClient(
+            url=_qdrant_url(),
+            api_key=QDRANT_API_KEY,
+            prefer_grpc=QDRANT_PREFER_GRPC,
+            timeout=QDRANT_TIMEOUT,
+            pool_size=QDRANT_POOL_SIZE,
+        )
+    return _qdrant
+
+def get_qdrant():
+    return _qdrant or init_qdrant()
+
+async def qdrant_ready():
+    """Readiness probe: True only if Qdrant answers and the collection exists."""
+    try:
+        return await get_qdrant().collection_exists(COLLECTION_NAME)
+    except Exception:
+        return False
+
+async def collection_version():
+    """Data version stamped into the collection metadata by the ingest scripts (None if unknown)."""
+    info = await get_qdrant().get_collection(COLLECTION_NAME)
+    return (info.config.metadata or {}).get("version")
+
+# --- LLM (OpenRouter) ---
+
+def get_llm():
+    global _llm
+    if _llm is None:
+        _llm = AsyncOpenAI(base_url="https://openrouter.ai/api/v1", api_key=OPENROUTER_API_KEY)
+    return _llm
+
+# --- LIFECYCLE ---
+
+def init_clients():
+    init_qdrant()
+    if OPENROUTER_API_KEY: get_llm()
+
+async def close_clients():
+    global _qdrant, _llm
+    if _qdrant is not None:
+        await _qdrant.close()
+        _qdrant = None
+    if _llm is not None:
+        await _llm.close()
+        _llm = None
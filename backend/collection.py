@@ -0,0 +1,104 @@
+import hashlib
+import json
+import time
+from qdrant_client import models
+from backend.embedder import EMBED_MODEL
+from backend.profiles import COLLECTION_PROFILE, create_params
+
+# The app always talks to COLLECTION_NAME, which is an alias pointing at a
+# versioned collection (freeme_collection_v<timestamp>). Full rebuilds fill
+# a fresh version and swap the alias in one call, so search never goes dark.
+
+SCROLL_PAGE = 1000
+DELETE_BATCH = 1000
+
+# Payload indexes behind the /recommend and /similar filters (and rating sort)
+PAYLOAD_INDEXES = {
+    'type': models.PayloadSchemaType.KEYWORD,
+    'rating': models.PayloadSchemaType.FLOAT,
+    'year': models.PayloadSchemaType.INTEGER,
+}
+
+# --- HASHING ---
+
+def content_hash(payload):
+    """Stable hash of everything that feeds the vector and the card (plus the model)."""
+    body = {k: v for k, v in payload.items() if k != 'content_hash'}
+    raw = json.dumps(body, sort_keys=True, default=str) + "|" + EMBED_MODEL
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+def existing_hashes(client, collection):
+    """{point id: content_hash} for every point, reading only that one payload key."""
+    hashes, offset = {}, None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection, limit=SCROLL_PAGE, offset=offset,
+            with_payload=['content_hash'], with_vectors=False,
+        )
+        for p in points: hashes[p.id] = (p.payload or {}).get('content_hash')
+        if offset is None: return hashes
+
+def delete_points(client, collection, ids):
+    ids = list(ids)
+    for i in range(0, len(ids), DELETE_BATCH):
+        client.delete(collection_name=collection, points_selector=models.PointIdsList(points=ids[i:i + DELETE_BATCH]))
+    return len(ids)
+
+# --- VERSIONS & ALIAS ---
+
+def resolve_alias(client, alias):
+    for a in client.get_aliases().aliases:
+        if a.alias_name == alias: return a.collection_name
+    return None
+
+def create_version(client, alias, profile=None):
+    name = f"{alias}_v{time.time_ns()}"  # two versions in one second (rebuild, then swap) must not collide
+    client.create_collection(collection_name=name, metadata={"version": str(time.time_ns())}, **create_params(profile))
+    print(f"🧱 Created '{name}' with profile '{profile or COLLECTION_PROFILE}'.")
+    ensure_indexes(client, name)
+    return name
+
+def ensure_indexes(client, collection):
+    """Idempotent; indexes built before the upload are filled as points arrive."""
+    for field, schema in PAYLOAD_INDEXES.items():
+        client.create_payload_index(collection_name=collection, field_name=field, field_schema=schema, wait=True)
+
+def swap_alias(client, alias, collection, drop_old=True):
+    """Atomically points `alias` at `collection`, then drops the version it replaced."""
+    old = resolve_alias(client, alias)
+    if old is None and client.collection_exists(alias):
+        # One-time migration: a real collection still holds the alias name
+        print(f"⚠️  Replacing legacy collection '{alias}' with an alias (brief gap, first run only).")
+        client.delete_collection(alias)
+
+    ops = []
+    if old: ops.append(models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=alias)))
+    ops.append(models.CreateAliasOperation(create_alias=models.CreateAlias(collection_name=collection, alias_name=alias)))
+    client.update_collection_aliases(change_aliases_operations=ops)
+    print(f"🔀 Alias '{alias}' -> '{collection}'")
+
+    if drop_old and old and old != collection:
+        client.delete_collection(old)
+        print(f"🗑️  Dropped previous version '{old}'.")
+    return old
+
+def bump_version(client, collection):
+    """Stamps a new data version into the collection metadata; API caches keyed on it drop stale entries."""
+    version = str(time.time_ns())
+    try:
+        client.update_collection(collection_name=collection, metadata={"version": version})
+    except Exception as e:  # Qdrant < 1.16 has no collection metadata: caches fall back to their TTL
+        print(f"⚠️  Could not stamp collection version: {e}")
+        return None
+    return version
+
+def ensure_collection(client, alias):
+    """Live collection behind `alias`, creating a first version if there is none."""
+    current = resolve_alias(client, alias)
+    if current is None and client.collection_exists(alias): current = alias  # legacy layout, still usable for deltas
+    if current:
+        ensure_indexes(client, current)
+        return current
+    name = create_version(client, alias)
+    swap_alias(client, alias, name)
+    return name
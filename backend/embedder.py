@@ -0,0 +1,162 @@
+import asyncio
+import os
+import httpx
+import requests
+from dotenv import load_dotenv
+from backend.ratelimit import AdaptiveRateLimiter
+
+# --- CONFIGURATION ---
+load_dotenv()
+
+# One model for queries AND corpus, so both live in the same vector space.
+EMBED_MODEL = os.getenv("EMBED_MODEL", "BAAI/bge-small-en-v1.5")
+EMBED_BACKEND = os.getenv("EMBED_BACKEND", "local")  # local | remote
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+# Optional ONNX Runtime backend, e.g. EMBED_ONNX_FILE=onnx/model_qint8_avx512_vnni.onnx
+EMBED_ONNX = os.getenv("EMBED_ONNX", "0") == "1"
+EMBED_ONNX_FILE = os.getenv("EMBED_ONNX_FILE")
+VECTOR_SIZE = 384
+
+HF_TOKEN = os.getenv("HF_TOKEN")
+
+_embedder = None
+
+# --- INTERFACE ---
+
+class Embedder:
+    """Turns texts into VECTOR_SIZE-d float lists.
+
+    `embed` returns one entry per input text, `None` where embedding failed.
+    Subclasses implement `embed`; `aembed` defaults to running it in a thread.
+    """
+
+    model = EMBED_MODEL
+
+    def embed(self, texts):
+        raise NotImplementedError
+
+    def embed_one(self, text):
+        return self.embed([text])[0]
+
+    async def aembed(self, texts):
+        return await asyncio.to_thread(self.embed, texts)
+
+    async def aclose(self):
+        pass
+
+# --- LOCAL (in-process CPU) ---
+
+class LocalEmbedder(Embedder):
+    def __init__(self, model=EMBED_MODEL, batch_size=EMBED_BATCH_SIZE, onnx=EMBED_ONNX, onnx_file=EMBED_ONNX_FILE):
+        from sentence_transformers import SentenceTransformer
+
+        kwargs = {"device": "cpu"}
+        if onnx:
+            kwargs["backend"] = "onnx"
+            if onnx_file: kwargs["model_kwargs"] = {"file_name": onnx_file}
+        self.model = model
+        self.batch_size = batch_size
+        self._model = SentenceTransformer(model, **kwargs)
+
+    def embed(self, texts):
+        if not texts: return []
+        vectors = self._model.encode(
+            list(texts), batch_size=self.batch_size, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return vectors.tolist()
+
+# --- REMOTE (Hugging Face Inference router) ---
+
+class RemoteEmbedder(Embedder):
+    def __init__(self, model=EMBED_MODEL, token=HF_TOKEN, batch_size=EMBED_BATCH_SIZE, retries=5, timeout=15, limiter=None):
+        self.model = model
+        self.url = f"https://router.huggingface.co/hf-inference/models/{model}"
+        self.token = token
+        self.batch_size = batch_size
+        self.retries = retries
+        self.timeout = timeout
+        # Batch jobs are paced by 429/503 feedback instead of fixed sleeps
+        self.limiter = limiter or AdaptiveRateLimiter()
+        self._http = None
+
+    @property
+    def headers(self):
+        return {"Authorization": f"Bearer {self.token}"}
+
+    def _payload(self, texts):
+        return {"inputs": list(texts), "options": {"wait_for_model": True}}
+
+    @staticmethod
+    def _parse(data, n):
+        # Router answers [[...], [...]] for list inputs, [...] for a lone input
+        if not isinstance(data, list) or not data: return [None] * n
+        if not isinstance(data[0], list): data = [data]
+        if len(data) != n: return [None] * n
+        return data
+
+    def embed(self, texts):
+        texts = list(texts)
+        out = []
+        for start in range(0, len(texts), self.batch_size):
+            out.extend(self._embed_batch(texts[start:start + self.batch_size]))
+        return out
+
+    def _embed_batch(self, batch):
+        if not self.token: return [None] * len(batch)
+        for attempt in range(self.retries):
+            self.limiter.wait()
+            try:
+                response = requests.post(self.url, headers=self.headers, json=self._payload(batch), timeout=self.timeout)
+                if response.status_code == 200:
+                    self.limiter.success()
+                    return self._parse(response.json(), len(batch))
+                if response.status_code in [503, 429, 504]:
+                    pause = self.limiter.throttled(response.headers.get("Retry-After"))
+                    print(f"   ⏳ API Busy ({response.status_code}). Slowing to one call per {pause:.1f}s...")
+                    continue
+                print(f"   ❌ API Error {response.status_code}: {response.text}")
+                break
+            except requests.RequestException:
+                print("   ❌ Connection Error. Retrying...")
+                self.limiter.throttled()
+        return [None] * len(batch)
+
+    async def aembed(self, texts):
+        texts = list(texts)
+        out = []
+        for start in range(0, len(texts), self.batch_size):
+            out.extend(await self._aembed_batch(texts[start:start + self.batch_size]))
+        return out
+
+    async def _aembed_batch(self, batch):
+        if not self.token: return [None] * len(batch)
+        if self._http is None:
+            self._http = httpx.AsyncClient(timeout=8, limits=httpx.Limits(max_connections=100, max_keepalive_connections=100))
+        # Query path: fail fast rather than hold the request for long backoffs
+        for attempt in range(3):
+            try:
+                response = await self._http.post(self.url, headers=self.headers, json=self._payload(batch))
+                if response.status_code == 200:
+                    return self._parse(response.json(), len(batch))
+                if response.status_code == 503:
+                    await asyncio.sleep(2)
+                    continue
+                break
+            except httpx.HTTPError:
+                continue
+        return [None] * len(batch)
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+# --- FACTORY ---
+
+def get_embedder(backend=None):
+    """Process-wide embedder; EMBED_BACKEND picks `local` (default) or `remote`."""
+    global _embedder
+    if _embedder is None:
+        backend = backend or EMBED_BACKEND
+        _embedder = RemoteEmbedder() if backend == "remote" else LocalEmbedder()
+    return _embedder
@@ -0,0 +1,56 @@
+import hashlib
+import os
+from urllib.parse import urlencode
+from fastapi import Request, Response
+from fastapi.responses import RedirectResponse
+from backend.embedder import EMBED_MODEL
+from backend.neighbors import current_version
+from backend.profiles import COLLECTION_PROFILE
+
+# GET search results are a pure function of (canonical URL, catalog version),
+# so browsers, CDNs and proxies may keep them. The ETag is the catalog
+# version stamp that ingestion bumps: revalidation is answered with a 304
+# from memory, before any embedding or Qdrant work.
+
+GET_CACHE_MAX_AGE = int(os.getenv("GET_CACHE_MAX_AGE", "300"))  # seconds a shared cache may serve without asking
+GET_CACHE_SWR = int(os.getenv("GET_CACHE_SWR", "3600"))  # stale-while-revalidate window after that
+
+def catalog_etag():
+    """ETag for the live catalog (None while the version is unknown). Weak: gzip / br bodies differ byte-wise."""
+    version = current_version()
+    if version is None: return None
+    # Model / profile are in too: a redeploy with another embedder changes every result
+    digest = hashlib.sha1(f"{version}|{EMBED_MODEL}|{COLLECTION_PROFILE}".encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+def canonical_query(params):
+    """Sorted, default-free query string: one cache key per distinct search."""
+    def text(v): return f"{v:g}" if isinstance(v, float) else str(v)  # 7.0 -> "7"
+    return urlencode(sorted((k, text(v)) for k, v in params.items() if v not in (None, "")))
+
+def redirect_to_canonical(request: Request, canonical):
+    """308 to the canonical URL when the query string is spelled differently, else None."""
+    if request.url.query == canonical: return None
+    return RedirectResponse(
+        f"{request.url.path}?{canonical}", status_code=308,
+        headers={"Cache-Control": f"public, max-age={GET_CACHE_SWR}"},
+    )
+
+def not_modified(request: Request, etag):
+    """304 if the client's copy carries the current ETag, else None."""
+    if etag is None: return None
+    tags = {t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")}
+    if etag.removeprefix("W/") in tags or "*" in tags:
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control()})
+    return None
+
+def cache_control():
+    return f"public, max-age={GET_CACHE_MAX_AGE}, stale-while-revalidate={GET_CACHE_SWR}"
+
+def set_cache_headers(response: Response, etag, page):
+    # Empty pages may just mean Qdrant was down: don't let a proxy pin them
+    if etag is None or not page:
+        response.headers["Cache-Control"] = "no-store"
+        return
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control()
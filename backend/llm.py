@@ -0,0 +1,210 @@
+import asyncio
+import json
+import os
+import re
+import uuid
+from dotenv import load_dotenv
+from backend.cache import TTLCache, normalize_text
+from backend.clients import get_llm
+from backend.metrics import record_error
+
+# --- CONFIGURATION ---
+load_dotenv()
+
+OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY")
+
+# ✅ NEW MODEL: NVIDIA Nemotron
+OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "nvidia/nemotron-nano-12b-v2-vl:free")
+
+# Parsed tile lists per normalized query; one LLM call per query per TTL window
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1000"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))
+
+llm_cache = TTLCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL)
+_inflight = {}  # normalized query -> asyncio.Task shared by concurrent callers
+
+# --- HELPERS ---
+
+def build_prompt(query):
+    # Prompt (Simplified: Don't ask for images, just data)
+    return f"""
+        You are a movie database API.
+        User Request: "{query}"
+
+        Generate 12 unique recommendations.
+        Return strictly a JSON array of objects.
+        Each object must have:
+        - "title": (String) Exact Title
+        - "description": (String) 1 sentence plot summary.
+        - "rating": (Float) IMDB style rating (e.g. 8.5)
+        - "type": (String) One of: MOVIE, TV, ANIME, DOCUMENTARY
+
+        Do NOT include markdown formatting. Just the raw JSON.
+        """
+
+def to_tile(item):
+    title = item.get('title', 'Unknown')
+    # ✨ TRICK: Use a Search Thumbnail Proxy to find the REAL poster
+    # This searches Bing Images for "{Title} Movie Poster" and returns the first result
+    safe_title = title.replace(" ", "%20")
+    image_url = f"https://tse4.mm.bing.net/th?q={safe_title}%20movie%20poster&w=400&h=600&c=7&rs=1"
+    return {
+        # Stable per title, so cached and fresh tiles for the same film share an id
+        "id": f"ai-{uuid.uuid5(uuid.NAMESPACE_URL, normalize_text(title))}",
+        "title": title,
+        "description": item.get('description', 'AI Generated.'),
+        "rating": item.get('rating', 0),
+        "type": str(item.get('type', 'MOVIE')).upper(),
+        "image": image_url, # ✅ NOW A WORKING REAL LINK
+        "score": 99
+    }
+
+# --- 🧠 GOD MODE GENERATOR (REAL POSTERS VERSION) ---
+
+async def _generate(query):
+    print(f"🧠 NVIDIA NEMOTRON: Reasoning about '{query}'...")
+
+    if not OPENROUTER_API_KEY:
+        print("❌ ERROR: No API Key.")
+        return []
+
+    try:
+        print("   ➡️ Sending request to OpenRouter...")
+
+        completion = await get_llm().chat.completions.create(
+            model=OPENROUTER_MODEL,
+            messages=[{"role": "user", "content": build_prompt(query)}],
+            extra_headers={"HTTP-Referer": "http://nexus-search.com"},
+            extra_body={"reasoning": {"enabled": True}}
+        )
+
+        content = completion.choices[0].message.content
+        print("   ⬅️ Received Response")
+
+        # Clean & Parse
+        clean_content = re.sub(r'```json|```', '', content).strip()
+        match = re.search(r'\[.*\]', clean_content, re.DOTALL)
+
+        if match:
+            results = [to_tile(item) for item in json.loads(match.group())]
+            print(f"✨ SUCCESS: Generated {len(results)} tiles with Real Posters.")
+            if results: llm_cache.set(normalize_text(query), results)
+            return results
+        else:
+            print(f"⚠️ PARSE ERROR: {content[:100]}...")
+            record_error("llm", "ParseError")
+
+    except Exception as e:
+        print(f"❌ CRASH: {e}")
+        record_error("llm", e)
+
+    return []
+
+async def get_llm_recommendations(query):
+    """Cached, single-flight God Mode call.
+
+    Concurrent identical queries await one shared upstream completion, which
+    keeps running even if the caller that started it disconnects.
+    """
+    key = normalize_text(query)
+    results = llm_cache.get(key)
+    if results is None:
+        task = _inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(_generate(query))
+            _inflight[key] = task
+            task.add_done_callback(lambda _: _inflight.pop(key, None))
+        results = await asyncio.shield(task)
+    # Callers may decorate tiles; never hand out the cached dicts themselves
+    return [dict(tile) for tile in results]
+
+# --- 🌊 STREAMING ---
+
+class ArrayObjectParser:
+    """Incrementally pulls complete objects out of a streamed JSON array.
+
+    Feed it text chunks as they arrive; each call returns the objects whose
+    closing brace was in that chunk. Anything outside an object (the array
+    brackets, commas, markdown fences) is skipped.
+    """
+
+    def __init__(self):
+        self._buf = []
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    def feed(self, chunk):
+        out = []
+        for ch in chunk:
+            if self._depth == 0:
+                if ch == '{':
+                    self._depth = 1
+                    self._buf = [ch]
+                continue
+            self._buf.append(ch)
+            if self._in_string:
+                if self._escape: self._escape = False
+                elif ch == '\\': self._escape = True
+                elif ch == '"': self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == '{':
+                self._depth += 1
+            elif ch == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        item = json.loads(''.join(self._buf))
+                        if isinstance(item, dict): out.append(item)
+                    except ValueError:
+                        pass
+                    self._buf = []
+        return out
+
+async def stream_llm_recommendations(query):
+    """Yields God Mode tiles one by one, as soon as each object is complete.
+
+    Cached or in-flight results for the same query are replayed instead of
+    opening a new completion; a fully streamed answer is cached for later.
+    """
+    key = normalize_text(query)
+    results = llm_cache.get(key)
+    if results is None and key in _inflight:
+        results = await asyncio.shield(_inflight[key])
+    if results is not None:
+        for tile in results: yield dict(tile)
+        return
+
+    print(f"🧠 NVIDIA NEMOTRON (stream): Reasoning about '{query}'...")
+    if not OPENROUTER_API_KEY:
+        print("❌ ERROR: No API Key.")
+        return
+
+    parser = ArrayObjectParser()
+    results = []
+    stream = None
+    completed = False  # only a stream that ran to its end is cached, never a truncated one
+    try:
+        stream = await get_llm().chat.completions.create(
+            model=OPENROUTER_MODEL,
+            messages=[{"role": "user", "content": build_prompt(query)}],
+            extra_headers={"HTTP-Referer": "http://nexus-search.com"},
+            extra_body={"reasoning": {"enabled": True}},
+            stream=True,
+        )
+        async for chunk in stream:
+            if not chunk.choices: continue
+            delta = chunk.choices[0].delta.content
+            if not delta: continue
+            for item in parser.feed(delta):
+                tile = to_tile(item)
+                results.append(tile)
+                yield dict(tile)
+        completed = True
+    except Exception as e:
+        record_error("llm_stream", e)
+    finally:
+        if stream is not None: await stream.close()
+
+    if completed and results: llm_cache.set(key, results)
@@ -1,36 +1,99 @@
-from fastapi import FastAPI, Depends, HTTPException
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
-from backend.database import Base, engine, SessionLocal
+from pydantic import BaseModel, Field, ValidationError
+from typing import Annotated, Dict, List, Literal, Optional
+from sqlalchemy import delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from backend.database import Base, engine, get_db, insert_ignore
 from backend.models import User, WishlistItem
-from backend.auth import get_current_user_db, login_user, hash_password
-import requests
+from backend.auth import change_password, get_current_user_db, login_user, logout_user, hash_password, migrate as migrate_users, token_cache
+from backend.batcher import get_batcher
+from backend.cards import CARD_PAYLOAD, Card, parse_fields, project
+from backend.cache import EmbeddingCache, normalize_text
+from backend.clients import COLLECTION_NAME, init_clients, close_clients, get_qdrant, qdrant_ready
+from backend.embedder import EMBED_MODEL, get_embedder
+from backend.llm import get_llm_recommendations, stream_llm_recommendations, llm_cache
+from backend.profiles import COLLECTION_PROFILE, search_params
+from backend.taste import add_item, blend, get_taste, pack, remove_item, unpack
+from backend.wishlist import fetch_item, migrate as migrate_wishlist, point_id, refresh_loop, to_card, valid_point_id
+from backend.neighbors import current_version, graph_page, graph_stats, load_graph, neighbor_cache, watch_version
+from backend.http_cache import canonical_query, catalog_etag, not_modified, redirect_to_canonical, set_cache_headers
+from backend.metrics import TimedORJSONResponse, TimingMiddleware, record_error, record_fallback, render_metrics, span
+import asyncio
+import base64
 import json
-import re
+import orjson
 import os
-import time
-import uuid
+from datetime import datetime
 from dotenv import load_dotenv
 from qdrant_client import models
-from openai import OpenAI  # <--- NEW CLIENT
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+try:
+    from brotli_asgi import BrotliMiddleware  # optional: pip install brotli-asgi
+except ImportError:
+    BrotliMiddleware = None
 
 # --- CONFIGURATION ---
 load_dotenv()
 
-HF_TOKEN = os.environ.get("HF_TOKEN")
-QDRANT_URL = os.environ.get("QDRANT_URL")
-QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
-OPENROUTER_API_KEY = os.environ.get("OPENROUTER_API_KEY")
-
-# Model: BAAI/bge-small-en-v1.5 (Embeddings)
-HF_API_URL = "https://router.huggingface.co/hf-inference/models/BAAI/bge-small-en-v1.5"
-
-# ✅ NEW MODEL: NVIDIA Nemotron
-OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL", "nvidia/nemotron-nano-12b-v2-vl:free")
-
-app = FastAPI(title="Nexus God Mode Engine")
+# Query embedding cache (memory LRU + SQLite file shared by all workers on a host)
+EMBED_CACHE_PATH = os.getenv("EMBED_CACHE_PATH", "backend/embedding_cache.db")
+EMBED_CACHE_SIZE = int(os.getenv("EMBED_CACHE_SIZE", "10000"))
+EMBED_CACHE_TTL = int(os.getenv("EMBED_CACHE_TTL", "86400"))
+
+# God Mode latency budget: >0 races the LLM against vector search (see hedged_*)
+LLM_BUDGET_MS = int(os.getenv("LLM_BUDGET_MS", "0"))
+
+# hnsw_ef / quantization rescoring matching how the collection was built (COLLECTION_PROFILE)
+SEARCH_PARAMS = search_params()
+
+# Response compression: bodies under COMPRESS_MIN_SIZE bytes go out as-is
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1000"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))  # 9 costs ~3x the CPU for a few % smaller pages
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# sort="rating" re-orders this many of the most relevant matches by rating (and pages end there)
+SORT_POOL = int(os.getenv("SORT_POOL", "100"))
+
+# UI filter -> stored `type` values (ingest uppercases them; seed data uses the short codes)
+TYPE_VARIANTS = {
+    "MOVIE": ["MOVIE", "MOVIES"],
+    "TV": ["TV", "TV SHOW", "TV SERIES", "SERIES"],
+    "ANIME": ["ANIME", "ANIME SERIES", "ANIME MOVIE"],
+    "DOC": ["DOC", "DOCUMENTARY", "DOCUMENTARIES", "DOCUSERIES"],
+    "STAND-UP": ["STAND-UP", "STAND-UP COMEDY"],
+}
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with engine.begin() as conn:
+        await conn.run_sync(migrate_users)
+        await conn.run_sync(migrate_wishlist)
+        await conn.run_sync(Base.metadata.create_all)
+    init_clients()
+    get_batcher()  # load the model before the first query, not during it
+    refresher = asyncio.create_task(refresh_loop())  # wishlist card snapshots
+    watcher = asyncio.create_task(watch_version())  # drops cached neighbors after re-ingests
+    flusher = asyncio.create_task(embedding_cache.flush_loop())  # batched embedding cache writes
+    await run_in_threadpool(load_graph)  # precomputed /similar lists, if build_neighbors.py has run
+    yield
+    refresher.cancel()
+    watcher.cancel()
+    flusher.cancel()
+    await close_clients()
+    await get_embedder().aclose()
+    embedding_cache.close()
+    await engine.dispose()
+
+# orjson serializes result pages several times faster than the stdlib encoder (timed as "serialize")
+app = FastAPI(title="Nexus God Mode Engine", lifespan=lifespan, default_response_class=TimedORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -38,222 +101,480 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
-Base.metadata.create_all(bind=engine)
+# Brotli when installed (gzip for clients that don't accept br), else gzip
+if BrotliMiddleware: app.add_middleware(BrotliMiddleware, quality=BROTLI_QUALITY, minimum_size=COMPRESS_MIN_SIZE, gzip_fallback=True)
+else: app.add_middleware(GZipMiddleware, minimum_size=COMPRESS_MIN_SIZE, compresslevel=GZIP_LEVEL)
+
+# Outermost: request histogram + Server-Timing (stages from backend.metrics.span)
+app.add_middleware(TimingMiddleware)
+
+embedding_cache = EmbeddingCache(EMBED_CACHE_PATH or None, EMBED_MODEL, maxsize=EMBED_CACHE_SIZE, ttl=EMBED_CACHE_TTL)
 
 # --- 🧠 CORE AI FUNCTIONS ---
 
-def get_embedding(text):
-    if not HF_TOKEN: return None
-    payload = {"inputs": [text], "options": {"wait_for_model": True}}
-    for attempt in range(3):
-        try:
-            response = requests.post(
-                HF_API_URL, headers={"Authorization": f"Bearer {HF_TOKEN}"}, json=payload, timeout=8
-            )
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, list) and len(data) > 0:
-                    return data[0] if isinstance(data[0], list) else data
-            if response.status_code == 503:
-                time.sleep(2)
-                continue
-            break
-        except:
-            continue
-    return None
+async def get_embedding(text):
+    cached = await embedding_cache.get(text)
+    if cached is not None: return cached
+    try:
+        # Concurrent queries are coalesced into one batched embedder call
+        with span("embed"): vector = await get_batcher().embed(text)
+    except Exception as e:
+        record_error("embed", e)
+        return None
+    if vector: embedding_cache.set(text, vector)
+    return vector
+
+def build_filter(req, exclude_id=None):
+    """Qdrant filter from the request's type / rating / year fields (None when unfiltered)."""
+    must = []
+    if req.type and req.type.upper() != "ALL":
+        kind = req.type.upper()
+        must.append(models.FieldCondition(key="type", match=models.MatchAny(any=TYPE_VARIANTS.get(kind, [kind]))))
+    if req.min_rating is not None or req.max_rating is not None:
+        must.append(models.FieldCondition(key="rating", range=models.Range(gte=req.min_rating, lte=req.max_rating)))
+    if req.min_year is not None or req.max_year is not None:
+        must.append(models.FieldCondition(key="year", range=models.Range(gte=req.min_year, lte=req.max_year)))
+    must_not = [models.HasIdCondition(has_id=[exclude_id])] if exclude_id is not None else []
+    if not must and not must_not: return None
+    return models.Filter(must=must or None, must_not=must_not or None)
+
+async def safe_vector_search(vector, limit=50, flt=None, sort=None, offset=0):
+    """`vector` may also be a point id: Qdrant looks up its vector server-side."""
+    try:
+        q_client = get_qdrant()
+        with span("qdrant"):
+            if sort == "rating":
+                # Filtered relevance pool first, then ordered by the `rating` index: one round trip
+                return (await q_client.query_points(
+                    collection_name=COLLECTION_NAME,
+                    prefetch=models.Prefetch(query=vector, filter=flt, params=SEARCH_PARAMS, limit=SORT_POOL),
+                    query=models.OrderByQuery(order_by=models.OrderBy(key="rating", direction=models.Direction.DESC)),
+                    limit=limit, offset=offset, with_payload=CARD_PAYLOAD,
+                )).points
+            return (await q_client.query_points(
+                collection_name=COLLECTION_NAME, query=vector, query_filter=flt, search_params=SEARCH_PARAMS,
+                limit=limit, offset=offset, with_payload=CARD_PAYLOAD,
+            )).points
+    except Exception as e:
+        record_error("qdrant", e)
+        return []
 
-def get_qdrant():
-    from qdrant_client import QdrantClient
-    url = QDRANT_URL
-    if url and url.startswith("ttps://"): url = url.replace("ttps://", "https://")
-    return QdrantClient(url=url, api_key=QDRANT_API_KEY)
+def to_items(hits, sort=None):
+    results = []
+    for h in hits:
+        item = dict(h.payload or {})
+        item["id"] = h.id
+        # Rating-ordered hits carry the rating as score, not a similarity
+        if sort != "rating": item["score"] = int(h.score * 100) if h.score else 0
+        results.append(item)
+    return results
 
-def get_db():
-    db = SessionLocal()
-    try: yield db
-    finally: db.close()
+async def vector_recommendations(text, top_k, flt=None, sort=None, offset=0, taste=None):
+    vector = await get_embedding(text)  # cursor pages hit the embedding cache, never the model
+    if not vector: return []
+    if taste: vector = blend(vector, taste)
+    return to_items(await safe_vector_search(vector, limit=top_k, flt=flt, sort=sort, offset=offset), sort)
 
-def safe_vector_search(vector, limit=50):
-    try: 
-        q_client = get_qdrant()
-        return q_client.query_points(collection_name="freeme_collection", query=vector, limit=limit).points
-    except: return []
+# --- 📜 PAGINATION ---
+# Opaque cursor = urlsafe base64 of the query state plus the next offset.
+# Follow-up pages skip the LLM and reuse the cached query vector: one Qdrant call per page.
 
-# --- 🧠 GOD MODE GENERATOR (REAL POSTERS VERSION) ---
-def get_llm_recommendations(query):
-    print(f"🧠 NVIDIA NEMOTRON: Reasoning about '{query}'...") 
+CURSOR_FIELDS = {"type", "min_rating", "max_rating", "min_year", "max_year", "sort", "top_k"}
 
-    if not OPENROUTER_API_KEY:
-        print("❌ ERROR: No API Key.")
-        return []
+def encode_cursor(state):
+    raw = json.dumps(state, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
 
+def decode_cursor(cursor, key):
     try:
-        # 1. Initialize OpenAI Client
-        client = OpenAI(
-            base_url="https://openrouter.ai/api/v1",
-            api_key=OPENROUTER_API_KEY,
-        )
+        state = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if state[key] and isinstance(state["o"], int) and state["o"] >= 0: return state
+    except Exception:
+        pass
+    raise HTTPException(status_code=400, detail="Invalid cursor")
 
-        # 2. Prompt (Simplified: Don't ask for images, just data)
-        prompt = f"""
-        You are a movie database API. 
-        User Request: "{query}"
-        
-        Generate 12 unique recommendations.
-        Return strictly a JSON array of objects. 
-        Each object must have:
-        - "title": (String) Exact Title
-        - "description": (String) 1 sentence plot summary.
-        - "rating": (Float) IMDB style rating (e.g. 8.5)
-        - "type": (String) One of: MOVIE, TV, ANIME, DOCUMENTARY
-        
-        Do NOT include markdown formatting. Just the raw JSON.
-        """
-        
-        print("   ➡️ Sending request to OpenRouter...")
-
-        # 3. Call API
-        completion = client.chat.completions.create(
-            model=OPENROUTER_MODEL,
-            messages=[{"role": "user", "content": prompt}],
-            extra_headers={"HTTP-Referer": "http://nexus-search.com"},
-            extra_body={"reasoning": {"enabled": True}}
-        )
+def set_cursor(response, cursor):
+    if cursor: response.headers["X-Next-Cursor"] = cursor
 
-        # 4. Extract Content
-        content = completion.choices[0].message.content
-        print("   ⬅️ Received Response")
-
-        # 5. Clean & Parse
-        clean_content = re.sub(r'```json|```', '', content).strip()
-        match = re.search(r'\[.*\]', clean_content, re.DOTALL)
-        
-        if match:
-            data = json.loads(match.group())
-            results = []
-            
-            for item in data:
-                # ✨ TRICK: Use a Search Thumbnail Proxy to find the REAL poster
-                # This searches Bing Images for "{Title} Movie Poster" and returns the first result
-                safe_title = item['title'].replace(" ", "%20")
-                image_url = f"https://tse4.mm.bing.net/th?q={safe_title}%20movie%20poster&w=400&h=600&c=7&rs=1"
-                
-                results.append({
-                    "id": f"ai-{uuid.uuid4()}",
-                    "title": item.get('title', 'Unknown'),
-                    "description": item.get('description', 'AI Generated.'),
-                    "rating": item.get('rating', 0),
-                    "type": item.get('type', 'MOVIE').upper(),
-                    "image": image_url, # ✅ NOW A WORKING REAL LINK
-                    "score": 99
-                })
-            
-            print(f"✨ SUCCESS: Generated {len(results)} tiles with Real Posters.")
-            return results
-        else:
-            print(f"⚠️ PARSE ERROR: {content[:100]}...")
+def from_cursor(model, state, **fields):
+    """Request rebuilt from a decoded cursor; a tampered one is a 400, not a 500."""
+    try:
+        return model(**fields, **{k: v for k, v in state.items() if k in CURSOR_FIELDS})
+    except ValidationError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def page_cursor(req, key, value, offset):
+    # Every rating-sorted page re-sorts the same SORT_POOL candidates, so paging stops at its end
+    if req.sort == "rating" and offset >= SORT_POOL: return None
+    return encode_cursor({key: value, "o": offset, **req.model_dump(include=CURSOR_FIELDS)})
+
+def next_cursor(req, key, value, offset, page):
+    """Cursor for the page after `offset`, or None once a short page shows the end."""
+    if len(page) < req.top_k: return None
+    return page_cursor(req, key, value, offset + req.top_k)
+
+async def llm_recommendations(text):
+    with span("llm"): return await get_llm_recommendations(text)
+
+# --- 🏁 HEDGED GOD MODE ---
+
+async def hedged_recommendations(text, top_k, budget, flt=None, sort=None, taste=None):
+    """Start the LLM and vector search together; LLM tiles win if they land within `budget` seconds.
+
+    Worst case is bounded by the budget. A late LLM call is not cancelled upstream:
+    its single-flight task finishes and fills the LLM cache for the next request.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget
+    llm = asyncio.ensure_future(llm_recommendations(text))
+    vec = asyncio.ensure_future(vector_recommendations(text, top_k, flt, sort, taste=taste))
+    try:
+        await asyncio.wait({llm}, timeout=budget)
+        if llm.done() and llm.result():
+            return llm.result()
+        record_fallback("llm", "vector")  # late or empty
+        done, _ = await asyncio.wait({vec}, timeout=max(0, deadline - loop.time()))
+        return vec.result() if done else []
+    finally:
+        llm.cancel()
+        vec.cancel()
+
+async def hedged_stream(text, top_k, budget, flt=None, sort=None, taste=None):
+    """Streaming twin of hedged_recommendations.
+
+    If no LLM tile arrives within `budget` seconds the vector hits are sent
+    first, and LLM tiles are merged in behind them as they are generated.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + budget
+    vec = asyncio.ensure_future(vector_recommendations(text, top_k, flt, sort, taste=taste))
+    llm = stream_llm_recommendations(text)
+    nxt = asyncio.ensure_future(llm.__anext__())
+    sent_llm = 0
+    fallback_sent = False
+    try:
+        while True:
+            waiting = not (sent_llm or fallback_sent)
+            done, _ = await asyncio.wait({nxt}, timeout=max(0, deadline - loop.time()) if waiting else None)
+            if not done:
+                # Budget spent without a single LLM tile: vector hits go out now
+                record_fallback("llm", "vector")
+                for item in await vec: yield item
+                fallback_sent = True
+                continue
+            try:
+                tile = nxt.result()
+            except StopAsyncIteration:
+                break
+            if not sent_llm and not fallback_sent: vec.cancel()
+            sent_llm += 1
+            yield tile
+            nxt = asyncio.ensure_future(llm.__anext__())
+        if not sent_llm and not fallback_sent:
+            record_fallback("llm", "vector")
+            for item in await vec: yield item
+    finally:
+        nxt.cancel()
+        vec.cancel()
+        # aclose() on a generator whose __anext__ is still pending raises; let the cancel land first
+        with suppress(asyncio.CancelledError, StopAsyncIteration): await nxt
+        await llm.aclose()
 
-    except Exception as e:
-        print(f"❌ CRASH: {e}")
+# --- ROUTES ---
 
-    return []
+TopK = Annotated[int, Field(ge=1, le=100)]  # 0 would page forever at the same offset
 
-# --- ROUTES ---
+class SearchFilters(BaseModel):
+    type: Optional[str] = None  # MOVIE / TV / ANIME / DOC / STAND-UP
+    min_rating: Optional[float] = None
+    max_rating: Optional[float] = None
+    min_year: Optional[int] = None
+    max_year: Optional[int] = None
+    sort: Literal["relevance", "rating"] = "relevance"
 
-class UserRequest(BaseModel): text: str; top_k: int = 12; model: str = "internal"
-class PersonalizedRequest(BaseModel): text: str; top_k: int = 12; model: str = "internal"
+class UserRequest(SearchFilters): text: str = ""; top_k: TopK = 12; model: str = "internal"; budget_ms: Optional[int] = None; cursor: Optional[str] = None
+class PersonalizedRequest(UserRequest): pass
 class AuthRequest(BaseModel): username: str; email: str; password: str
-class SimilarRequest(BaseModel): id: str
+class PasswordChangeRequest(BaseModel): old_password: str; new_password: str
+class SimilarRequest(SearchFilters): id: str = ""; top_k: TopK = 12; cursor: Optional[str] = None
+class SimilarBatchRequest(SearchFilters): ids: List[str] = Field(max_length=100); top_k: TopK = 12
+class VectorQuery(SearchFilters): text: str = ""; top_k: TopK = 12; cursor: Optional[str] = None
 
 @app.get("/")
-def health_check(): return {"status": "online", "mode": "GOD_MODE_NVIDIA"}
+async def health_check():
+    return {
+        "status": "online",
+        "mode": "GOD_MODE_NVIDIA",
+        "collection_profile": COLLECTION_PROFILE,
+        "vector_db": "ready" if await qdrant_ready() else "unreachable",
+        "embedding_cache": embedding_cache.stats(),
+        "embedding_batcher": get_batcher().stats(),
+        "llm_cache": llm_cache.stats(),
+        "neighbor_cache": neighbor_cache.stats(),
+        "collection_version": current_version(),
+        "neighbor_graph": graph_stats(),
+        "auth_cache": token_cache.stats(),
+    }
+
+@app.get("/metrics")
+def metrics():
+    body, content_type = render_metrics()
+    return Response(body, media_type=content_type)
 
 @app.post("/login")
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    return login_user(form, db)
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    return await login_user(form, db)
+
+@app.post("/logout")
+async def logout(u=Depends(get_current_user_db), db: AsyncSession = Depends(get_db)):
+    return await logout_user(u, db)
+
+@app.post("/password")
+async def password(data: PasswordChangeRequest, u=Depends(get_current_user_db), db: AsyncSession = Depends(get_db)):
+    return await change_password(u, data.old_password, data.new_password, db)
 
 @app.post("/signup")
-def signup(data: AuthRequest, db: Session = Depends(get_db)):
-    if db.query(User).filter(User.username == data.username).first():
+async def signup(data: AuthRequest, db: AsyncSession = Depends(get_db)):
+    if await db.scalar(select(User.id).where(User.username == data.username)):
+        raise HTTPException(status_code=400, detail="Username taken")
+    hashed = await run_in_threadpool(hash_password, data.password)
+    db.add(User(username=data.username, email=data.email, hashed_password=hashed))
+    try:
+        await db.commit()
+    except IntegrityError:  # lost a race for the username, or the email is in use
         raise HTTPException(status_code=400, detail="Username taken")
-    user = User(username=data.username, email=data.email, hashed_password=hash_password(data.password))
-    db.add(user)
-    db.commit()
     return {"status": "created"}
 
-@app.post("/recommend")
-def recommend(req: UserRequest):
+@app.post("/recommend", response_model=List[Card], response_model_exclude_unset=True)
+async def recommend(req: UserRequest, response: Response, fields: Optional[str] = None):
+    return await _recommend(req, response, fields)
+
+async def _recommend(req, response, fields, taste=None):
+    """Shared by /recommend and /recommend/personalized; `taste` stays out of the route signature."""
+    wanted = parse_fields(fields)
+    # Next page: vector search only, from the state frozen in the cursor
+    if req.cursor:
+        state = decode_cursor(req.cursor, "q")
+        page_req = from_cursor(UserRequest, state, text=state["q"])
+        page = await vector_recommendations(page_req.text, page_req.top_k, build_filter(page_req), page_req.sort, state["o"], taste)
+        set_cursor(response, next_cursor(page_req, "q", page_req.text, state["o"], page))
+        return project(page, wanted)
+
+    if not req.text: raise HTTPException(status_code=422, detail="text or cursor required")
+    flt = build_filter(req)
     # 1. If user wants AI (God Mode)
     if req.model == 'api':
-        results = get_llm_recommendations(req.text)
-        if results: return results
+        budget = LLM_BUDGET_MS if req.budget_ms is None else req.budget_ms
+        if budget > 0: results = await hedged_recommendations(req.text, req.top_k, budget / 1000, flt, req.sort, taste)
+        else: results = await llm_recommendations(req.text)
+        if results:
+            # LLM picks: "more" continues with the vector hits from the top
+            ai = str(results[0]["id"]).startswith("ai-")
+            set_cursor(response, page_cursor(req, "q", req.text, 0) if ai
+                       else next_cursor(req, "q", req.text, 0, results))
+            return project(results, wanted)
+        # The race already ran (and counted) its vector search: a second one would blow the budget
+        if budget > 0: return []
         # If AI fails, fall through to vector search
+        record_fallback("llm", "vector")
     
     # 2. Standard Vector Search (Fallback)
-    vector = get_embedding(req.text)
-    if not vector: return []
-    hits = safe_vector_search(vector, limit=req.top_k)
-    results = []
-    for h in hits:
-        item = h.payload
-        item["id"] = h.id
-        item["score"] = int(h.score * 100) if h.score else 0 
-        results.append(item)
-    return results
-
-@app.post("/recommend/personalized")
-def personalized(req: PersonalizedRequest, user=Depends(get_current_user_db)):
-    return recommend(UserRequest(text=req.text, top_k=req.top_k, model=req.model))
-
-@app.post("/similar")
-def similar(req: SimilarRequest):
-    q_client = get_qdrant()
+    page = await vector_recommendations(req.text, req.top_k, flt, req.sort, taste=taste)
+    set_cursor(response, next_cursor(req, "q", req.text, 0, page))
+    return project(page, wanted)
+
+def get_params(req, fields):
+    """Query parameters that identify a GET search; a cursor already carries the rest."""
+    params = {"cursor": req.cursor} if req.cursor else req.model_dump(exclude_defaults=True, exclude={"cursor"})
+    if params.get("type"): params["type"] = params["type"].upper()
+    if params.get("text"): params["text"] = normalize_text(params["text"])
+    wanted = parse_fields(fields)
+    if wanted: params["fields"] = ",".join(sorted(wanted))
+    return params
+
+@app.get("/recommend", response_model=List[Card], response_model_exclude_unset=True)
+async def recommend_get(request: Request, response: Response, req: VectorQuery = Depends(), fields: Optional[str] = None):
+    """Cacheable vector search (no God Mode, no personalization): same URL, same page, until the catalog changes."""
+    params = get_params(req, fields)
+    redirect = redirect_to_canonical(request, canonical_query(params))
+    if redirect: return redirect
+    etag = catalog_etag()
+    unchanged = not_modified(request, etag)
+    if unchanged: return unchanged
+    if not req.cursor: req.text = params.get("text", "")
+    page = await recommend(UserRequest(**req.model_dump()), response, fields)
+    set_cache_headers(response, etag, page)
+    return page
+
+@app.post("/recommend/stream")
+async def recommend_stream(req: UserRequest, fields: Optional[str] = None):
+    """NDJSON: one tile per line, God Mode tiles flushed as the LLM writes them.
+
+    Headers go out before the tiles, so the cursor always points at the
+    vector hits after the first page; /recommend serves the pages after that.
+    """
+    if not req.text: raise HTTPException(status_code=422, detail="text required")
+    wanted = parse_fields(fields)
+    flt = build_filter(req)
+    offset = 0 if req.model == 'api' else req.top_k
+    cursor = page_cursor(req, "q", req.text, offset)
+
+    async def tiles():
+        sent = 0
+        if req.model == 'api':
+            budget = LLM_BUDGET_MS if req.budget_ms is None else req.budget_ms
+            source = hedged_stream(req.text, req.top_k, budget / 1000, flt, req.sort) if budget > 0 else stream_llm_recommendations(req.text)
+            async for tile in source:
+                sent += 1
+                yield orjson.dumps(project([tile], wanted)[0], default=str) + b"\n"
+        # If AI fails (or wasn't asked for), stream the vector results instead
+        if not sent:
+            if req.model == 'api': record_fallback("llm_stream", "vector")
+            for item in project(await vector_recommendations(req.text, req.top_k, flt, req.sort), wanted):
+                yield orjson.dumps(item, default=str) + b"\n"
+    # identity: compression middleware would buffer the tiles instead of flushing each one
+    return StreamingResponse(tiles(), media_type="application/x-ndjson", headers={"Content-Encoding": "identity", **({"X-Next-Cursor": cursor} if cursor else {})})
+
+@app.post("/recommend/personalized", response_model=List[Card], response_model_exclude_unset=True)
+async def personalized(req: PersonalizedRequest, response: Response, fields: Optional[str] = None, user=Depends(get_current_user_db), db: AsyncSession = Depends(get_db)):
+    # Precomputed centroid: one local primary-key read, no wishlist scan or vector fetch
+    taste = await get_taste(db, user.id)
+    return await _recommend(req, response, fields, taste)
+
+def unfiltered(req):
+    """The precomputed graph only holds plain relevance order."""
+    return req.sort == "relevance" and build_filter(req) is None
+
+def neighbor_key(pid, req, offset):
+    return (current_version(), str(pid), offset, *req.model_dump(include=CURSOR_FIELDS).values())
+
+def similar_query(pid, req, offset=0):
+    """Batch-query twin of safe_vector_search(pid, ...): query by point id, source excluded."""
+    flt = build_filter(req, exclude_id=pid)
+    if req.sort == "rating":
+        return models.QueryRequest(
+            prefetch=models.Prefetch(query=pid, filter=flt, params=SEARCH_PARAMS, limit=SORT_POOL),
+            query=models.OrderByQuery(order_by=models.OrderBy(key="rating", direction=models.Direction.DESC)),
+            limit=req.top_k, offset=offset, with_payload=CARD_PAYLOAD,
+        )
+    return models.QueryRequest(query=pid, filter=flt, params=SEARCH_PARAMS, limit=req.top_k, offset=offset, with_payload=CARD_PAYLOAD)
+
+@app.post("/similar", response_model=List[Card], response_model_exclude_unset=True)
+async def similar(req: SimilarRequest, response: Response, fields: Optional[str] = None):
+    wanted = parse_fields(fields)
+    offset = 0
+    if req.cursor:
+        state = decode_cursor(req.cursor, "id")
+        req = from_cursor(SimilarRequest, state, id=state["id"])
+        offset = state["o"]
+    if not req.id: raise HTTPException(status_code=422, detail="id or cursor required")
     if str(req.id).startswith("ai-"): return [] 
-    try:
-        tgt = q_client.retrieve("freeme_collection", ids=[req.id], with_vectors=True)
-        if not tgt: return []
-        hits = safe_vector_search(tgt[0].vector, limit=13)
-        results = []
-        for h in hits:
-            if str(h.id) != str(req.id):
-                item = h.payload
-                item["id"] = h.id
-                item["score"] = 95
-                results.append(item)
-        return results[:12]
-    except:
-        return []
+    pid = point_id(req.id)  # row-number ids from older ingests
+    key = neighbor_key(pid, req, offset)
+    page = graph_page(pid, offset, req.top_k) if unfiltered(req) else None
+    if page is None: page = neighbor_cache.get(key)
+    if page is None:
+        # Query by id: Qdrant uses the stored vector, and the source item is
+        # excluded by the filter, so a full page comes back in one round trip
+        # (safe_vector_search absorbs and counts Qdrant errors as an empty page)
+        hits = await safe_vector_search(pid, limit=req.top_k, flt=build_filter(req, exclude_id=pid), sort=req.sort, offset=offset)
+        page = to_items(hits, req.sort)
+        if page: neighbor_cache.set(key, page)  # empty may just mean Qdrant was down
+    set_cursor(response, next_cursor(req, "id", req.id, offset, page))
+    return project(page, wanted)
+
+@app.get("/similar", response_model=List[Card], response_model_exclude_unset=True)
+async def similar_get(request: Request, response: Response, req: SimilarRequest = Depends(), fields: Optional[str] = None):
+    """Cacheable twin of POST /similar, revalidated with the catalog ETag."""
+    redirect = redirect_to_canonical(request, canonical_query(get_params(req, fields)))
+    if redirect: return redirect
+    etag = catalog_etag()
+    unchanged = not_modified(request, etag)
+    if unchanged: return unchanged
+    page = await similar(req, response, fields)
+    set_cache_headers(response, etag, page)
+    return page
+
+async def similar_one(mid: str, req: SimilarBatchRequest):
+    pid = point_id(mid)
+    return to_items(await safe_vector_search(pid, limit=req.top_k, flt=build_filter(req, exclude_id=pid), sort=req.sort), req.sort)
+
+@app.post("/similar/batch", response_model=Dict[str, List[Card]], response_model_exclude_unset=True)
+async def similar_batch(req: SimilarBatchRequest, fields: Optional[str] = None):
+    """{id: first page of neighbors} for many ids: cache hits from memory, misses in one batch query."""
+    wanted = parse_fields(fields)
+    results, missing = {}, []
+    for mid in dict.fromkeys(req.ids):  # dedupe, keep order
+        if mid.startswith("ai-") or not valid_point_id(mid):
+            results[mid] = []
+            continue
+        cached = graph_page(point_id(mid), 0, req.top_k) if unfiltered(req) else None
+        if cached is None: cached = neighbor_cache.get(neighbor_key(point_id(mid), req, 0))
+        if cached is None: missing.append(mid)
+        else: results[mid] = cached
+    if missing:
+        try:
+            with span("qdrant"):
+                responses = await get_qdrant().query_batch_points(
+                    collection_name=COLLECTION_NAME, requests=[similar_query(point_id(mid), req) for mid in missing],
+                )
+            pages = [to_items(res.points, req.sort) for res in responses]
+        except Exception as e:
+            record_error("qdrant", e)
+            if isinstance(e, UnexpectedResponse) and 400 <= (e.status_code or 0) < 500:
+                # One unknown/deleted id rejects the whole batch: redo it per id so only that one comes back empty
+                record_fallback("qdrant_batch", "per_id")
+                pages = await asyncio.gather(*(similar_one(mid, req) for mid in missing))
+            else:
+                pages = [[] for _ in missing]  # Qdrant is down: don't fan out N more failing calls
+        for mid, page in zip(missing, pages):
+            if page: neighbor_cache.set(neighbor_key(point_id(mid), req, 0), page)
+            results[mid] = page
+    return {mid: project(page, wanted) for mid, page in results.items()}
 
 @app.post("/wishlist/add/{mid}")
-def add_w(mid: str, u=Depends(get_current_user_db), db: Session = Depends(get_db)):
+async def add_w(mid: str, u=Depends(get_current_user_db), db: AsyncSession = Depends(get_db)):
     if mid.startswith("ai-"): raise HTTPException(status_code=400, detail="Cannot save AI items.")
-    if not db.query(WishlistItem).filter_by(user_id=u.id, media_id=mid).first():
-        db.add(WishlistItem(user_id=u.id, media_id=mid))
-        db.commit()
+    if not valid_point_id(mid): raise HTTPException(status_code=404, detail="Item not found")
+    # Card + vector in one retrieve; if Qdrant is down the refresh job fills both in later
+    try:
+        with span("qdrant"): card, vector = await fetch_item(mid)
+    except Exception as e:
+        record_error("qdrant", e)
+        record_fallback("qdrant", "wishlist_refresh")
+        card, vector = None, None
+    else:
+        if card is None: raise HTTPException(status_code=404, detail="Item not found")  # not in the collection
+
+    # Single upsert on the unique (user_id, media_id) index: re-adds and double clicks are no-ops
+    saved = await db.execute(insert_ignore(WishlistItem).values(
+        user_id=u.id, media_id=mid, **(card or {}), added_at=datetime.utcnow(),
+        refreshed_at=datetime.utcnow() if card else None, vector=pack(vector) if vector else None,
+    ))
+    if saved.rowcount and vector: await add_item(db, u.id, vector)  # O(dim) centroid update, same transaction
+    await db.commit()
     return {"status": "ok"}
 
 @app.delete("/wishlist/remove/{mid}")
-def rem_w(mid: str, u=Depends(get_current_user_db), db: Session = Depends(get_db)):
-    db.query(WishlistItem).filter_by(user_id=u.id, media_id=mid).delete()
-    db.commit()
+async def rem_w(mid: str, u=Depends(get_current_user_db), db: AsyncSession = Depends(get_db)):
+    removed = await db.scalars(
+        delete(WishlistItem).where(WishlistItem.user_id == u.id, WishlistItem.media_id == mid).returning(WishlistItem.vector)
+    )
+    for blob in removed.all():
+        vector = unpack(blob)
+        if vector: await remove_item(db, u.id, vector)  # stored vector: no Qdrant call
+    await db.commit()
     return {"status": "ok"}
 
-@app.get("/wishlist")
-def get_w(u=Depends(get_current_user_db), db: Session = Depends(get_db)):
-    q_client = get_qdrant()
-    ids = [i.media_id for i in db.query(WishlistItem).filter_by(user_id=u.id).all()]
-    if not ids: return []
-    try: 
-        points = q_client.retrieve("freeme_collection", ids=ids)
-        results = []
-        for p in points:
-            item = p.payload
-            item["id"] = p.id
-            results.append(item)
-        return results
-    except: return []
+@app.get("/wishlist", response_model=List[Card], response_model_exclude_unset=True)
+async def get_w(fields: Optional[str] = None, u=Depends(get_current_user_db), db: AsyncSession = Depends(get_db)):
+    wanted = parse_fields(fields)
+    # One indexed local query (user_id); card data comes from the stored snapshot
+    rows = await db.scalars(select(WishlistItem).where(WishlistItem.user_id == u.id).order_by(WishlistItem.added_at.desc()))
+    return project([to_card(r) for r in rows.all()], wanted)
 
 if __name__ == "__main__":
     import uvicorn
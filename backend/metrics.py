@@ -0,0 +1,131 @@
+import os
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fastapi.responses import ORJSONResponse
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest
+
+# Per-stage latency. `with span("qdrant"): ...` feeds the stage histogram and
+# the current request's Server-Timing header; record_error / record_fallback
+# count what used to disappear into bare excepts. /metrics exposes it all.
+# A stage reports self time: a span minus the stages nested in it (the "db"
+# queries inside "auth"), so no time is counted twice.
+
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))  # share of requests run under pyinstrument
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")  # HTML reports land here
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+STAGE_SECONDS = Histogram("freeme_stage_seconds", "Time spent per pipeline stage", ["stage"], buckets=LATENCY_BUCKETS)
+REQUEST_SECONDS = Histogram("freeme_request_seconds", "Request latency up to the response headers", ["route", "status"], buckets=LATENCY_BUCKETS)
+ERRORS = Counter("freeme_errors_total", "Exceptions caught and absorbed, by stage", ["stage", "error"])
+FALLBACKS = Counter("freeme_fallbacks_total", "Degraded answers, by what failed and what served instead", ["source", "fallback"])
+
+_timings = ContextVar("server_timings", default=None)  # [(stage, seconds)] for the current request
+_nested = ContextVar("nested_seconds", default=None)  # [seconds] of stages inside the innermost open span
+
+def _record(stage, seconds):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    timings = _timings.get()
+    if timings is not None: timings.append((stage, seconds))
+
+def observe(stage, seconds):
+    _record(stage, seconds)
+    nested = _nested.get()
+    if nested is not None: nested[0] += seconds
+
+@contextmanager
+def span(stage):
+    parent = _nested.get()
+    nested = [0.0]
+    token = _nested.set(nested)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _nested.reset(token)
+        _record(stage, max(elapsed - nested[0], 0.0))
+        if parent is not None: parent[0] += elapsed
+
+def record_error(stage, error):
+    """`error`: the exception, or a short name for failures that aren't one."""
+    ERRORS.labels(stage, error if isinstance(error, str) else type(error).__name__).inc()
+
+def record_fallback(source, fallback):
+    FALLBACKS.labels(source, fallback).inc()
+
+def server_timing(timings, total):
+    """`embed;dur=12.3, qdrant;dur=4.1, total;dur=20.0`; repeated stages are summed."""
+    summed = {}
+    for stage, seconds in timings: summed[stage] = summed.get(stage, 0.0) + seconds
+    summed["total"] = total
+    return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in summed.items())
+
+def render_metrics():
+    """Prometheus text format. Under several workers set PROMETHEUS_MULTIPROC_DIR to aggregate them."""
+    registry = REGISTRY
+    if os.getenv("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+class TimedORJSONResponse(ORJSONResponse):
+    def render(self, content):
+        with span("serialize"): return super().render(content)
+
+# --- MIDDLEWARE ---
+
+class TimingMiddleware:
+    """Request histogram + Server-Timing header, and the optional sampling profiler.
+
+    Plain ASGI, so streamed responses pass through untouched (their header
+    carries the stages finished before the first byte).
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        timings = []
+        token = _timings.set(timings)
+        started = time.perf_counter()
+        profiler = _start_profiler() if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE else None
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - started
+                endpoint = scope.get("endpoint")  # set by the router; the raw path would explode label cardinality
+                REQUEST_SECONDS.labels(getattr(endpoint, "__name__", "unmatched"), str(message["status"])).observe(total)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(timings, total).encode()))
+                headers.append((b"timing-allow-origin", b"*"))  # readable by the cross-origin frontend too
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _timings.reset(token)
+            if profiler: _save_profile(profiler, scope)
+
+def _start_profiler():
+    try:
+        from pyinstrument import Profiler  # optional: pip install pyinstrument
+    except ImportError:
+        return None
+    profiler = Profiler(async_mode="enabled")
+    profiler.start()
+    return profiler
+
+def _save_profile(profiler, scope):
+    profiler.stop()
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = scope["path"].strip("/").replace("/", "_") or "root"
+    path = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{time.time_ns() % 10**6}.html")
+    with open(path, "w") as f: f.write(profiler.output_html())
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, String, DateTime, ForeignKey, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -11,6 +11,7 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")  # bumped on logout / password change
 
     wishlist = relationship("WishlistItem", back_populates="user")
 
@@ -19,8 +20,29 @@ class WishlistItem(Base):
     __tablename__ = "wishlist_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    media_id = Column(Integer, nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    media_id = Column(String, nullable=False, index=True)  # Qdrant point id (uuid5 string)
     added_at = Column(DateTime, default=datetime.utcnow)
 
-    user = relationship("User", back_populates="wishlist")
\ No newline at end of file
+    # Card snapshot, so GET /wishlist never has to call Qdrant (see backend/wishlist.py)
+    title = Column(String)
+    type = Column(String)
+    rating = Column(Float)
+    image = Column(String)
+    refreshed_at = Column(DateTime)
+    vector = Column(LargeBinary)  # float32 item vector, lets the taste centroid drop it without a fetch
+
+    user = relationship("User", back_populates="wishlist")
+
+    # One row per saved item: wishlist adds are INSERT ... ON CONFLICT DO NOTHING against this
+    __table_args__ = (Index("ux_wishlist_user_media", "user_id", "media_id", unique=True),)
+
+
+class UserTaste(Base):
+    __tablename__ = "user_taste"
+
+    # Running centroid of the user's wishlist vectors (see backend/taste.py)
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    vector = Column(LargeBinary, nullable=False)  # float32 array
+    count = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow)
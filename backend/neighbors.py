@@ -0,0 +1,121 @@
+import asyncio
+import json
+import os
+from dotenv import load_dotenv
+from backend.cache import TTLCache
+from backend.clients import collection_version
+from backend.metrics import record_error
+
+# "More like this" lists per (point, filters, page). Popular titles are
+# explored over and over, so their neighbors come from memory. Entries are
+# dropped when the ingest scripts stamp a new collection version.
+load_dotenv()
+
+NEIGHBOR_CACHE_SIZE = int(os.getenv("NEIGHBOR_CACHE_SIZE", "5000"))
+NEIGHBOR_CACHE_TTL = int(os.getenv("NEIGHBOR_CACHE_TTL", "86400"))
+VERSION_POLL_INTERVAL = int(os.getenv("VERSION_POLL_INTERVAL", "30"))  # seconds
+NEIGHBOR_GRAPH_PATH = os.getenv("NEIGHBOR_GRAPH_PATH", "neighbor_graph")  # written by build_neighbors.py
+
+neighbor_cache = TTLCache(maxsize=NEIGHBOR_CACHE_SIZE, ttl=NEIGHBOR_CACHE_TTL)
+_version = None
+_graph = None
+_graph_stamp_loaded = None
+
+# --- PRECOMPUTED GRAPH ---
+
+class NeighborGraph:
+    """Memory-mapped top-K lists from build_neighbors.py; a page is two array slices.
+
+    Every array (cards included, as one packed JSON blob plus offsets) is an
+    mmap'd .npy, so all workers on a host share one copy in the page cache.
+    """
+
+    def __init__(self, path):
+        import numpy as np  # only needed when a graph is deployed
+
+        def load(name): return np.load(os.path.join(path, name), mmap_mode="r")
+        with open(os.path.join(path, "meta.json")) as f: self.meta = json.load(f)
+        self.keys = load("keys.npy")  # sorted str(point id), for binary search
+        self.key_rows = load("key_rows.npy")
+        self.cards = load("cards.npy")  # uint8 blob: row i is cards[offsets[i]:offsets[i + 1]]
+        self.offsets = load("card_offsets.npy")
+        self.neighbors = load("neighbors.npy")
+        self.scores = load("scores.npy")
+        self.version = self.meta.get("version")
+        self.k = self.meta["k"]
+        self.n = self.meta["n"]
+        self._searchsorted = np.searchsorted
+
+    def row(self, pid):
+        key = str(pid).encode()
+        i = int(self._searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key: return int(self.key_rows[i])
+        return None
+
+    def card(self, row):
+        return json.loads(self.cards[self.offsets[row]:self.offsets[row + 1]].tobytes())
+
+    def page(self, pid, offset, limit):
+        """Items in /similar format, or None when the id or the page depth is not covered."""
+        row = self.row(pid)
+        if row is None or offset + limit > self.k: return None
+        items = []
+        for j, score in zip(self.neighbors[row, offset:offset + limit], self.scores[row, offset:offset + limit]):
+            items.append({**self.card(j), "score": int(score * 100)})
+        return items
+
+def _graph_stamp(path):
+    """Identity of the deployed build: build_neighbors.py swaps in a new directory (new inode)."""
+    try:
+        st = os.stat(os.path.join(path, "meta.json"))
+    except OSError:
+        return None
+    return (st.st_ino, st.st_mtime_ns)
+
+def load_graph(path=NEIGHBOR_GRAPH_PATH):
+    """(Re)load the graph if a different build is on disk; a failed load keeps the current one."""
+    global _graph, _graph_stamp_loaded
+    stamp = _graph_stamp(path) if path else None
+    if stamp is None or stamp == _graph_stamp_loaded: return _graph
+    try:
+        _graph = NeighborGraph(path)
+        _graph_stamp_loaded = stamp
+        print(f"🕸️  Neighbor graph loaded: {_graph.n} items x {_graph.k} (version {_graph.version}).")
+    except Exception as e:
+        print(f"⚠️ Could not load neighbor graph from '{path}': {e}")
+    return _graph
+
+def graph_page(pid, offset, limit):
+    """Precomputed neighbors if the graph matches the live collection version, else None."""
+    if _graph is None or _version is None: return None  # version not known yet: can't tell a stale build
+    if _graph.version != _version: return None  # stale build
+    return _graph.page(pid, offset, limit)
+
+def graph_stats():
+    if _graph is None: return None
+    return {"items": _graph.n, "k": _graph.k, "version": _graph.version, "current": _version is not None and _graph.version == _version}
+
+def current_version():
+    return _version
+
+async def check_version():
+    """Polls the collection version; clears the neighbor cache when it moved and picks up a rebuilt graph."""
+    global _version
+    version = await collection_version()
+    if version != _version:
+        if _version is not None: print(f"🔄 Collection version {_version} -> {version}: neighbor cache cleared.")
+        neighbor_cache.clear()
+        _version = version
+    # build_neighbors.py usually runs after the ingest bump, so look for a new build on every poll
+    await asyncio.to_thread(load_graph)
+    return version
+
+async def watch_version():
+    while True:
+        try:
+            await check_version()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            record_error("version_poll", e)  # Qdrant unreachable: keep serving what we have
+        await asyncio.sleep(VERSION_POLL_INTERVAL)
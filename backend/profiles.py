@@ -0,0 +1,67 @@
+import os
+from dotenv import load_dotenv
+from qdrant_client import models
+from backend.embedder import VECTOR_SIZE
+
+# Collection profiles: storage/index layout at create time + matching search params.
+# Pick one with COLLECTION_PROFILE; compare them with benchmark.py before switching.
+load_dotenv()
+
+COLLECTION_PROFILE = os.getenv("COLLECTION_PROFILE", "float32")
+
+PROFILES = {
+    # Plain float32 vectors in RAM, default HNSW (what every script used to create)
+    "float32": {},
+    # int8 codes in RAM (4x smaller), originals re-score the oversampled candidates
+    "int8": {
+        "quantization": models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        ),
+        "oversampling": 2.0,
+    },
+    # 1 bit per dimension (32x smaller); needs more oversampling to hold recall
+    "binary": {
+        "quantization": models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True)),
+        "oversampling": 3.0,
+    },
+    # int8 in RAM, float32 originals and payloads on disk: smallest footprint with rescoring
+    "int8-disk": {
+        "quantization": models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        ),
+        "oversampling": 2.0,
+        "on_disk": True,
+        "on_disk_payload": True,
+    },
+    # Denser graph, wider search: best recall, more RAM and slower builds
+    "hnsw-high": {"m": 32, "ef_construct": 256, "hnsw_ef": 256},
+}
+
+def get_profile(name=None):
+    name = name or COLLECTION_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown collection profile '{name}' (choose from {', '.join(PROFILES)})")
+    return PROFILES[name]
+
+def create_params(name=None):
+    """kwargs for `create_collection`."""
+    p = get_profile(name)
+    params = {
+        "vectors_config": models.VectorParams(
+            size=VECTOR_SIZE, distance=models.Distance.COSINE, on_disk=p.get("on_disk"),
+        ),
+    }
+    if "m" in p or "ef_construct" in p:
+        params["hnsw_config"] = models.HnswConfigDiff(m=p.get("m"), ef_construct=p.get("ef_construct"))
+    if "quantization" in p: params["quantization_config"] = p["quantization"]
+    if "on_disk_payload" in p: params["on_disk_payload"] = p["on_disk_payload"]
+    return params
+
+def search_params(name=None):
+    """`SearchParams` for queries against a collection built with this profile (None = server defaults)."""
+    p = get_profile(name)
+    quant = None
+    if "quantization" in p:
+        quant = models.QuantizationSearchParams(rescore=True, oversampling=p.get("oversampling"))
+    if quant is None and "hnsw_ef" not in p: return None
+    return models.SearchParams(hnsw_ef=p.get("hnsw_ef"), quantization=quant)
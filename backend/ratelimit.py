@@ -0,0 +1,71 @@
+import threading
+import time
+
+
+class AdaptiveRateLimiter:
+    """Paces calls to an upstream that signals overload with 429/503.
+
+    The gap between calls doubles on every throttled response (or jumps to
+    the server's Retry-After) and shrinks again by `recover` on each success,
+    so a batch job settles at the rate the provider actually allows.
+    """
+
+    def __init__(self, min_interval=0.0, max_interval=60.0, backoff=2.0, recover=0.8, floor=1.0):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.recover = recover
+        self.floor = floor  # first throttle waits at least this long
+        self.interval = min_interval
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if delay > 0: time.sleep(delay)
+
+    def success(self):
+        with self._lock:
+            self.interval = max(self.min_interval, self.interval * self.recover)
+            if self.interval < 0.01: self.interval = self.min_interval
+
+    def throttled(self, retry_after=None):
+        with self._lock:
+            self.interval = min(self.max_interval, max(self.interval * self.backoff, self.floor))
+            try:
+                retry_after = float(retry_after or 0)
+            except ValueError:  # HTTP-date form; rely on our own backoff
+                retry_after = 0
+            pause = max(self.interval, retry_after)
+            self._next = max(self._next, time.monotonic() + pause)
+        return pause
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` calls per second, bursts up to `capacity`.
+
+    Give each upstream host its own bucket so a slow provider never eats
+    into another one's allowance.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
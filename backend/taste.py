@@ -0,0 +1,56 @@
+import math
+import os
+from array import array
+from datetime import datetime
+from backend.models import UserTaste
+
+# A user's taste is the running mean of their wishlist item vectors. Adding or
+# removing one item moves the centroid in O(dim), with no re-read of the
+# wishlist and no Qdrant call: wishlist rows keep the vector they were saved with.
+
+TASTE_ALPHA = float(os.getenv("TASTE_ALPHA", "0.3"))  # weight of the taste vector in personalized queries
+
+def pack(vector):
+    return array("f", vector).tobytes()
+
+def unpack(blob):
+    return array("f", blob).tolist() if blob else None
+
+async def add_item(db, user_id, vector):
+    """c' = c + (v - c) / (n + 1). Caller commits."""
+    row = await db.get(UserTaste, user_id)
+    if row is None:
+        db.add(UserTaste(user_id=user_id, vector=pack(vector), count=1, updated_at=datetime.utcnow()))
+        await db.flush()  # visible to the next add_item in this session (backfill adds several)
+        return
+    n = row.count
+    centroid = unpack(row.vector)
+    row.vector = pack([c + (v - c) / (n + 1) for c, v in zip(centroid, vector)])
+    row.count = n + 1
+    row.updated_at = datetime.utcnow()
+
+async def remove_item(db, user_id, vector):
+    """c' = (c * n - v) / (n - 1); the row goes away with the last item. Caller commits."""
+    row = await db.get(UserTaste, user_id)
+    if row is None: return
+    n = row.count
+    if n <= 1:
+        await db.delete(row)
+        return
+    centroid = unpack(row.vector)
+    row.vector = pack([(c * n - v) / (n - 1) for c, v in zip(centroid, vector)])
+    row.count = n - 1
+    row.updated_at = datetime.utcnow()
+
+async def get_taste(db, user_id):
+    row = await db.get(UserTaste, user_id)
+    return unpack(row.vector) if row else None
+
+def _unit(vector):
+    norm = math.sqrt(sum(x * x for x in vector)) or 1.0
+    return [x / norm for x in vector]
+
+def blend(query, taste, alpha=TASTE_ALPHA):
+    """Unit-length mix of the query and the taste centroid (cosine space)."""
+    if not taste or alpha <= 0: return query
+    return _unit([(1 - alpha) * q + alpha * t for q, t in zip(_unit(query), _unit(taste))])
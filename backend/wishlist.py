@@ -0,0 +1,173 @@
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta
+from qdrant_client.http.exceptions import UnexpectedResponse
+from sqlalchemy import inspect, or_, select, text, update
+from backend.clients import COLLECTION_NAME, get_qdrant
+from backend.database import SessionLocal
+from backend.metrics import record_error
+from backend.models import WishlistItem
+from backend.taste import add_item, pack
+
+# Wishlist rows carry a compact card snapshot taken at add time. A background
+# job re-reads stale snapshots from Qdrant in batches, so the wishlist view is
+# one indexed SQLite query and never waits on the vector DB.
+
+SNAPSHOT_FIELDS = ["title", "type", "rating", "image"]
+REFRESH_INTERVAL = int(os.getenv("WISHLIST_REFRESH_INTERVAL", "3600"))  # seconds between sweeps
+REFRESH_MAX_AGE = int(os.getenv("WISHLIST_REFRESH_MAX_AGE", "86400"))  # snapshot age that triggers a re-read
+REFRESH_BATCH = int(os.getenv("WISHLIST_REFRESH_BATCH", "256"))  # ids per Qdrant retrieve
+
+def point_id(mid):
+    return int(mid) if str(mid).isdigit() else str(mid)  # row-number ids from older ingests
+
+def valid_point_id(mid):
+    """Qdrant ids are unsigned ints or UUIDs; anything else can only be a bad request."""
+    if str(mid).isdigit(): return True
+    try:
+        uuid.UUID(str(mid))
+        return True
+    except ValueError:
+        return False
+
+def snapshot(payload):
+    payload = payload or {}
+    rating = payload.get("rating")
+    try: rating = float(rating) if rating not in (None, "") else None
+    except (TypeError, ValueError): rating = None
+    return {
+        "title": payload.get("title"),
+        "type": payload.get("type"),
+        "rating": rating,
+        "image": payload.get("image"),
+    }
+
+def to_card(row):
+    return {"id": row.media_id, "title": row.title or "", "type": row.type, "rating": row.rating, "image": row.image}
+
+async def retrieve(ids, **kwargs):
+    """Points for `ids`; ids Qdrant rejects are skipped like deleted ones.
+
+    A rejected batch is split in halves until the bad ids are isolated, so one
+    of them costs a few extra calls instead of stalling the sweep on the same
+    batch forever. Outages (anything but a 4xx) still raise.
+    """
+    ids = [i for i in ids if valid_point_id(i)]
+    if not ids: return []
+    try:
+        return await get_qdrant().retrieve(COLLECTION_NAME, ids=[point_id(i) for i in ids], **kwargs)
+    except UnexpectedResponse as e:
+        if not e.status_code or not 400 <= e.status_code < 500: raise
+        if len(ids) == 1:
+            record_error("wishlist_refresh", "RejectedId")
+            return []
+    half = len(ids) // 2
+    return await retrieve(ids[:half], **kwargs) + await retrieve(ids[half:], **kwargs)
+
+async def fetch_snapshots(ids):
+    """{media_id: snapshot} for the ids still in the collection (one retrieve call unless one is rejected)."""
+    points = await retrieve(ids, with_payload=SNAPSHOT_FIELDS)
+    return {str(p.id): snapshot(p.payload) for p in points}
+
+async def fetch_item(mid):
+    """(card snapshot, vector) for one point, in a single retrieve; (None, None) if it is gone."""
+    points = await get_qdrant().retrieve(COLLECTION_NAME, ids=[point_id(mid)], with_payload=SNAPSHOT_FIELDS, with_vectors=True)
+    if not points: return None, None
+    return snapshot(points[0].payload), points[0].vector
+
+# --- REFRESH ---
+
+async def _stale_ids(limit):
+    cutoff = datetime.utcnow() - timedelta(seconds=REFRESH_MAX_AGE)
+    async with SessionLocal() as db:
+        rows = await db.scalars(
+            select(WishlistItem.media_id)
+            .where(or_(WishlistItem.refreshed_at.is_(None), WishlistItem.refreshed_at < cutoff))
+            .distinct().limit(limit)
+        )
+        return rows.all()
+
+async def _store(ids, snapshots):
+    now = datetime.utcnow()
+    async with SessionLocal() as db:
+        for mid in ids:
+            # Points gone from the collection keep their last snapshot
+            values = {**snapshots.get(mid, {}), "refreshed_at": now}
+            await db.execute(update(WishlistItem).where(WishlistItem.media_id == mid).values(values))
+        await db.commit()
+
+async def refresh_snapshots(ids=None):
+    """Re-reads snapshots for `ids` (default: one batch of stale ones). Returns how many were checked."""
+    ids = ids if ids is not None else await _stale_ids(REFRESH_BATCH)
+    if not ids: return 0
+    snapshots = await fetch_snapshots(ids)
+    await _store(ids, snapshots)
+    return len(ids)
+
+async def _missing_vectors(limit):
+    async with SessionLocal() as db:
+        rows = await db.scalars(select(WishlistItem.media_id).where(WishlistItem.vector.is_(None)).distinct().limit(limit))
+        return rows.all()
+
+async def _store_vectors(ids, vectors):
+    async with SessionLocal() as db:
+        rows = await db.scalars(select(WishlistItem).where(WishlistItem.media_id.in_(ids), WishlistItem.vector.is_(None)))
+        for row in rows.all():
+            vector = vectors.get(row.media_id)
+            row.vector = pack(vector) if vector else b""  # b"": point gone, don't ask again
+            if vector: await add_item(db, row.user_id, vector)
+        await db.commit()
+
+async def backfill_vectors():
+    """Rows saved before item vectors were kept (or while Qdrant was down) join their user's taste here."""
+    ids = await _missing_vectors(REFRESH_BATCH)
+    if not ids: return 0
+    points = await retrieve(ids, with_payload=False, with_vectors=True)
+    await _store_vectors(ids, {str(p.id): p.vector for p in points})
+    return len(ids)
+
+async def refresh_loop():
+    while True:
+        try:
+            # Drain every stale batch, then sleep until the next sweep
+            while await backfill_vectors() == REFRESH_BATCH: pass
+            while await refresh_snapshots() == REFRESH_BATCH: pass
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"⚠️ Wishlist refresh failed: {e}")
+            record_error("wishlist_refresh", e)
+        await asyncio.sleep(REFRESH_INTERVAL)
+
+# --- MIGRATION ---
+
+UNIQUE_INDEX = "ux_wishlist_user_media"
+KEEP_FIRST = "SELECT MIN(id) FROM {table} GROUP BY user_id, media_id"  # one row per (user, item)
+
+def migrate(conn):
+    """Brings wishlist_items up to the current model (run via conn.run_sync): rebuilds the
+    pre-snapshot table, adds new columns, dedupes rows before the unique (user_id, media_id) index."""
+    insp = inspect(conn)
+    if not insp.has_table("wishlist_items"): return
+    columns = {c["name"] for c in insp.get_columns("wishlist_items")}
+    if "title" in columns:
+        if "vector" not in columns:
+            conn.execute(text("ALTER TABLE wishlist_items ADD COLUMN vector BLOB"))
+        if UNIQUE_INDEX not in {idx["name"] for idx in insp.get_indexes("wishlist_items")}:
+            print("🛠️  Migrating wishlist_items: unique (user_id, media_id)...")
+            conn.execute(text(f"DELETE FROM wishlist_items WHERE id NOT IN ({KEEP_FIRST.format(table='wishlist_items')})"))
+            conn.execute(text(f"CREATE UNIQUE INDEX {UNIQUE_INDEX} ON wishlist_items (user_id, media_id)"))
+        return
+    print("🛠️  Migrating wishlist_items: string media ids + card snapshot columns...")
+    old_indexes = [idx["name"] for idx in insp.get_indexes("wishlist_items")]
+    conn.execute(text("ALTER TABLE wishlist_items RENAME TO wishlist_items_old"))
+    for name in old_indexes:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))  # names clash with the new table's
+    WishlistItem.__table__.create(conn)
+    conn.execute(text(
+        "INSERT INTO wishlist_items (id, user_id, media_id, added_at) "
+        "SELECT id, user_id, CAST(media_id AS TEXT), added_at FROM wishlist_items_old "
+        f"WHERE id IN ({KEEP_FIRST.format(table='wishlist_items_old')})"
+    ))
+    conn.execute(text("DROP TABLE wishlist_items_old"))
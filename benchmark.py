@@ -0,0 +1,169 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+from qdrant_client import QdrantClient, models
+from backend.embedder import VECTOR_SIZE
+from backend.profiles import PROFILES, create_params, get_profile, search_params
+
+# ==========================================
+#  COLLECTION PROFILE BENCHMARK
+# ==========================================
+# For every profile: build a collection, run the same queries, and report
+# recall@k against exact (NumPy brute force) search, p50/p99 latency and RAM.
+#
+#   python benchmark.py                       # local mode, synthetic vectors
+#   python benchmark.py --dataset dataset.csv --n 5000
+#   python benchmark.py --url http://localhost:6333 --profiles float32,int8,binary
+#
+# Local mode (QdrantClient(path=...)) is always an exact scan: HNSW and
+# quantization settings are accepted but not applied there. Use --url against
+# a Qdrant server (docker run -p 6333:6333 qdrant/qdrant) to measure them.
+
+BENCH_PREFIX = "bench_"
+
+# --- DATA ---
+def synthetic_vectors(n, dim, seed=0):
+    """Clustered unit vectors: closer to real embeddings than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(8, n // 200), dim))
+    vectors = centers[rng.integers(0, len(centers), n)] + 0.35 * rng.normal(size=(n, dim))
+    return normalize(vectors.astype(np.float32))
+
+def dataset_vectors(path, n):
+    import pandas as pd
+    from backend.catalog import build_col_map, normalize_columns, prepare_frame, search_texts
+    from backend.embedder import get_embedder
+
+    df = pd.read_csv(path, nrows=n)
+    df = prepare_frame(df, build_col_map(normalize_columns(df.head(0).copy())))
+    print(f"🧠 Embedding {len(df)} rows from {path}...")
+    vectors = get_embedder().embed(search_texts(df).tolist())
+    return normalize(np.array([v for v in vectors if v], dtype=np.float32))
+
+def normalize(x):
+    return x / np.linalg.norm(x, axis=1, keepdims=True).clip(min=1e-12)
+
+def make_queries(vectors, count, seed=1):
+    # Perturbed catalog items: "more like this" style queries with a known neighbourhood
+    rng = np.random.default_rng(seed)
+    picks = vectors[rng.integers(0, len(vectors), count)]
+    return normalize(picks + 0.1 * rng.normal(size=picks.shape).astype(np.float32))
+
+def exact_top_k(vectors, queries, k):
+    sims = queries @ vectors.T
+    top = np.argpartition(-sims, k, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+# --- MEMORY ---
+def rss_mb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"): return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    import resource  # peak, not current, outside Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def estimated_ram_mb(profile, n, dim):
+    """Server-side RAM for vectors + HNSW links, from the profile layout."""
+    p = get_profile(profile)
+    quant = p.get("quantization")
+    originals = 0 if p.get("on_disk") else n * dim * 4
+    if isinstance(quant, models.ScalarQuantization): codes = n * dim
+    elif isinstance(quant, models.BinaryQuantization): codes = n * dim / 8
+    else: codes = 0
+    graph = n * p.get("m", 16) * 2 * 4  # level-0 links dominate
+    return (originals + codes + graph) / 1024 / 1024
+
+# --- RUN ---
+def wait_indexed(client, name, timeout=600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if client.get_collection(name).status == models.CollectionStatus.GREEN: return
+        time.sleep(1)
+    print(f"⚠️  '{name}' still optimizing after {timeout}s, numbers may be pessimistic.")
+
+def bench_profile(client, profile, vectors, queries, truth, k, local):
+    name = BENCH_PREFIX + profile.replace("-", "_")
+    if client.collection_exists(name): client.delete_collection(name)
+
+    before = rss_mb()
+    started = time.time()
+    client.create_collection(collection_name=name, **create_params(profile))
+    client.upload_points(
+        collection_name=name, batch_size=256, wait=True,
+        points=(models.PointStruct(id=i, vector=v.tolist()) for i, v in enumerate(vectors)),
+    )
+    if not local: wait_indexed(client, name)
+    build_s = time.time() - started
+    loaded = rss_mb() - before
+
+    params = search_params(profile)
+    latencies, hits = [], 0
+    for q, expected in zip(queries, truth):
+        t = time.perf_counter()
+        points = client.query_points(collection_name=name, query=q.tolist(), search_params=params, limit=k).points
+        latencies.append((time.perf_counter() - t) * 1000)
+        hits += len(expected & {p.id for p in points})
+
+    client.delete_collection(name)
+    return {
+        "profile": profile,
+        "recall": hits / (len(queries) * k),
+        "p50": float(np.percentile(latencies, 50)),
+        "p99": float(np.percentile(latencies, 99)),
+        "build_s": build_s,
+        "est_ram": estimated_ram_mb(profile, len(vectors), vectors.shape[1]),
+        "rss": loaded if local else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Recall / latency / RAM per collection profile.")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="comma-separated, see backend/profiles.py")
+    parser.add_argument("--n", type=int, default=20000, help="points per collection")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dataset", default=None, help="embed the first --n rows of this CSV instead of synthetic vectors")
+    parser.add_argument("--path", default=None, help="local storage dir (default: a temp dir, removed afterwards)")
+    parser.add_argument("--url", default=None, help="benchmark against a Qdrant server instead of local mode")
+    parser.add_argument("--api-key", default=os.getenv("QDRANT_API_KEY"))
+    args = parser.parse_args()
+
+    profiles = [p.strip() for p in args.profiles.split(",") if p.strip()]
+    for p in profiles: get_profile(p)  # fail fast on typos
+
+    vectors = dataset_vectors(args.dataset, args.n) if args.dataset else synthetic_vectors(args.n, VECTOR_SIZE)
+    queries = make_queries(vectors, args.queries)
+    truth = exact_top_k(vectors, queries, args.k)
+    print(f"📊 {len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, k={args.k}")
+
+    local = args.url is None
+    tmp = None
+    if local:
+        tmp = None if args.path else tempfile.mkdtemp(prefix="qdrant_bench_")
+        client = QdrantClient(path=args.path or tmp)
+        print("📁 LOCAL MODE: exact scan, HNSW/quantization are NOT applied (recall ~1.0 for every profile).")
+    else:
+        client = QdrantClient(url=args.url, api_key=args.api_key, timeout=120)
+        print(f"☁️ SERVER MODE: {args.url}")
+
+    results = []
+    try:
+        for profile in profiles:
+            print(f"⏱️  {profile}...")
+            results.append(bench_profile(client, profile, vectors, queries, truth, args.k, local))
+    finally:
+        client.close()
+        if tmp: shutil.rmtree(tmp, ignore_errors=True)
+
+    print(f"\n{'profile':<12}{'recall@' + str(args.k):>10}{'p50 ms':>10}{'p99 ms':>10}{'build s':>10}{'est RAM MB':>12}{'RSS Δ MB':>10}")
+    for r in results:
+        rss = f"{r['rss']:.1f}" if r['rss'] is not None else "-"
+        print(f"{r['profile']:<12}{r['recall']:>10.3f}{r['p50']:>10.2f}{r['p99']:>10.2f}{r['build_s']:>10.1f}{r['est_ram']:>12.1f}{rss:>10}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient
+from backend.cards import CARD_PAYLOAD
+
+# ==========================================
+#  OFFLINE NEIGHBOR GRAPH
+# ==========================================
+# Scrolls every vector out of freeme_collection, computes each item's top-K
+# cosine neighbors with blocked matrix products and writes:
+#   keys.npy          sorted str(point id), key_rows.npy: their row numbers
+#   neighbors.npy     int32  [N, K] row numbers of the neighbors, best first
+#   scores.npy        float32[N, K] cosine similarities
+#   cards.npy         uint8 blob of JSON cards (id + what /similar returns),
+#   card_offsets.npy  int64 [N + 1]: row i is cards[offsets[i]:offsets[i + 1]]
+#   meta.json         k, n, collection version, build time
+# Everything is a .npy the API memory-maps (NEIGHBOR_GRAPH_PATH), so workers
+# share the page cache; it answers unfiltered /similar pages from it while the
+# collection version matches and picks up a new build on its version poll.
+load_dotenv()
+
+QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+COLLECTION_NAME = "freeme_collection"
+SCROLL_PAGE = 1000
+
+# --- EXPORT ---
+def export_points(client):
+    ids, vectors, cards, offset = [], [], [], None
+    while True:
+        points, offset = client.scroll(
+            collection_name=COLLECTION_NAME, limit=SCROLL_PAGE, offset=offset, with_payload=CARD_PAYLOAD, with_vectors=True,
+        )
+        for p in points:
+            if not p.vector: continue
+            ids.append(p.id)
+            vectors.append(p.vector)
+            cards.append(p.payload or {})
+        print(f"   Scrolled {len(ids)} points...", end="\r")
+        if offset is None: break
+    print()
+    x = np.asarray(vectors, dtype=np.float32)
+    x /= np.linalg.norm(x, axis=1, keepdims=True).clip(min=1e-12)
+    return ids, x, cards
+
+# --- TOP-K ---
+_X = None
+
+def _init_worker(path):
+    global _X
+    _X = np.load(path, mmap_mode="r")
+
+def top_k_block(start, stop, k, x=None):
+    """Top-k neighbors (self excluded) for rows [start, stop)."""
+    x = _X if x is None else x
+    sims = np.asarray(x[start:stop]) @ np.asarray(x).T
+    sims[np.arange(stop - start), np.arange(start, stop)] = -np.inf
+    idx = np.argpartition(-sims, k, axis=1)[:, :k]
+    part = np.take_along_axis(sims, idx, axis=1)
+    order = np.argsort(-part, axis=1)
+    return start, np.take_along_axis(idx, order, axis=1).astype(np.int32), np.take_along_axis(part, order, axis=1)
+
+def build_graph(x, k, block, workers):
+    n = len(x)
+    k = min(k, n - 1)
+    neighbors = np.empty((n, k), dtype=np.int32)
+    scores = np.empty((n, k), dtype=np.float32)
+    ranges = [(s, min(s + block, n)) for s in range(0, n, block)]
+
+    def collect(results):
+        for done, (start, idx, sc) in enumerate(results, 1):
+            neighbors[start:start + len(idx)] = idx
+            scores[start:start + len(idx)] = sc
+            print(f"   Blocks {done}/{len(ranges)}", end="\r")
+        print()
+
+    if workers <= 1:
+        collect(top_k_block(s, e, k, x) for s, e in ranges)
+        return neighbors, scores
+
+    # Workers memory-map one shared copy of the matrix instead of pickling it per task
+    tmp = tempfile.mkdtemp(prefix="neighbors_")
+    try:
+        path = os.path.join(tmp, "x.npy")
+        np.save(path, x)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(path,)) as pool:
+            collect(pool.map(top_k_block, *zip(*ranges), [k] * len(ranges)))
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return neighbors, scores
+
+# --- OUTPUT ---
+def write_graph(out, ids, neighbors, scores, cards, version):
+    # Build next to the target and swap directories, so a running server never sees half a graph
+    tmp = tempfile.mkdtemp(prefix=".neighbors_", dir=os.path.dirname(os.path.abspath(out)) or ".")
+    keys = np.array([str(pid).encode() for pid in ids])
+    order = np.argsort(keys)
+    np.save(os.path.join(tmp, "keys.npy"), keys[order])
+    np.save(os.path.join(tmp, "key_rows.npy"), order.astype(np.int32))
+    np.save(os.path.join(tmp, "neighbors.npy"), neighbors)
+    np.save(os.path.join(tmp, "scores.npy"), scores)
+    blobs = [json.dumps({**card, "id": pid}, default=str).encode() for pid, card in zip(ids, cards)]
+    np.save(os.path.join(tmp, "card_offsets.npy"), np.concatenate([[0], np.cumsum([len(b) for b in blobs])]).astype(np.int64))
+    np.save(os.path.join(tmp, "cards.npy"), np.frombuffer(b"".join(blobs), dtype=np.uint8))
+    with open(os.path.join(tmp, "meta.json"), "w") as f:
+        json.dump({"n": len(ids), "k": int(neighbors.shape[1]), "version": version, "built": time.time()}, f)
+    old = out + ".old"
+    if os.path.exists(out): os.replace(out, old)
+    os.replace(tmp, out)
+    shutil.rmtree(old, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute the top-K neighbor graph for /similar.")
+    parser.add_argument("--out", default=os.getenv("NEIGHBOR_GRAPH_PATH", "neighbor_graph"))
+    parser.add_argument("--k", type=int, default=100, help="neighbors kept per item (max page depth served)")
+    parser.add_argument("--block", type=int, default=1024, help="rows per matrix product (memory: block x N floats)")
+    parser.add_argument("--workers", type=int, default=1, help="processes for the top-K blocks")
+    args = parser.parse_args()
+
+    if QDRANT_URL and QDRANT_API_KEY:
+        print(f"☁️ CONNECTING TO QDRANT CLOUD: {QDRANT_URL}")
+        client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, timeout=120)
+    else:
+        print("📁 USING LOCAL STORAGE (qdrant_storage)")
+        client = QdrantClient(path="qdrant_storage")
+
+    started = time.time()
+    print(f"📤 Exporting vectors from '{COLLECTION_NAME}'...")
+    version = (client.get_collection(COLLECTION_NAME).config.metadata or {}).get("version")
+    ids, x, cards = export_points(client)
+    if len(ids) < 2:
+        print("❌ Not enough points to build a graph.")
+        return
+
+    print(f"🧮 Top-{args.k} for {len(ids)} items (blocks of {args.block}, {args.workers} worker(s))...")
+    neighbors, scores = build_graph(x, args.k, args.block, args.workers)
+    write_graph(args.out, ids, neighbors, scores, cards, version)
+    size = sum(os.path.getsize(os.path.join(args.out, f)) for f in os.listdir(args.out)) / 1024 / 1024
+    print(f"✅ DONE! Graph for version {version} written to '{args.out}' ({size:.1f} MB) in {time.time() - started:.1f}s.")
+
+if __name__ == "__main__":
+    main()
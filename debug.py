@@ -27,16 +27,15 @@ try:
         print("✅ SUCCESS: The Brain is loaded and ready.")
         
         # 3. Test a Search manually to verify connections
-        from sentence_transformers import SentenceTransformer
+        from backend.embedder import get_embedder
         print("\n🧪 Running Test Search for 'Action Movie'...")
-        model = SentenceTransformer('all-MiniLM-L6-v2')
-        vector = model.encode("Action Movie").tolist()
+        vector = get_embedder().embed_one("Action Movie")
         
-        results = client.search(
+        results = client.query_points(
             collection_name=COLLECTION_NAME,
-            query_vector=vector,
+            query=vector,
             limit=1
-        )
+        ).points
         
         if results:
             print(f"🎉 Search Works! Found: {results[0].payload['title']}")
@@ -79,6 +79,8 @@ document.addEventListener("DOMContentLoaded", () => {
 
     // --- APP LOGIC ---
     const API_URL = "https://nexus-neural-search.onrender.com";
+    const FIELDS = "description,id,image,rating,score,title,type"; // what renderResults draws: smaller pages
+    const CARD_FIELDS = `fields=${FIELDS}`;
     let AUTH_TOKEN = localStorage.getItem("freeme_token");
     let CURRENT_USER = localStorage.getItem("freeme_user");
     let WISHLIST_IDS = new Set();
@@ -89,6 +91,8 @@ document.addEventListener("DOMContentLoaded", () => {
     let CURRENT_FILTER = 'ALL';
     let CURRENT_SORT = 'RELEVANCE';
     let lastSearchData = [];
+    let NEXT_CURSOR = null; // opaque X-Next-Cursor from the last page; null = no more results
+    let LOADING_MORE = false;
     let SEARCH_HISTORY = [];
     try { SEARCH_HISTORY = JSON.parse(localStorage.getItem('freeme_history')) || []; } catch (e) { }
 
@@ -172,7 +176,7 @@ document.addEventListener("DOMContentLoaded", () => {
         finally { btn.innerText = originalText; btn.disabled = false; }
     };
 
-    window.logout = () => { localStorage.removeItem('freeme_token'); localStorage.removeItem('freeme_user'); localStorage.removeItem('freeme_history'); location.reload(); };
+    window.logout = () => { if (AUTH_TOKEN) fetch(`${API_URL}/logout`, { method: 'POST', keepalive: true, headers: { "Authorization": `Bearer ${AUTH_TOKEN}` } }).catch(() => {}); localStorage.removeItem('freeme_token'); localStorage.removeItem('freeme_user'); localStorage.removeItem('freeme_history'); location.reload(); };
 
     // --- SEARCH LOGIC ---
     function addToHistory(q) {
@@ -181,19 +185,67 @@ document.addEventListener("DOMContentLoaded", () => {
         localStorage.setItem('freeme_history', JSON.stringify(SEARCH_HISTORY));
     }
 
+    // NDJSON reader: calls onTiles with everything received so far, one line per tile
+    async function readTileStream(res, onTiles) {
+        const reader = res.body.getReader(); const decoder = new TextDecoder();
+        const tiles = []; let buffer = "";
+        while (true) {
+            const { value, done } = await reader.read();
+            if (done) break;
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split("\n"); buffer = lines.pop();
+            const fresh = lines.filter(l => l.trim()).map(l => JSON.parse(l));
+            if (fresh.length) { tiles.push(...fresh); onTiles(tiles); }
+        }
+        return tiles;
+    }
+
+    // Filters and sort run server-side (indexed Qdrant filter), so every page is full
+    // GET URL in the server's canonical form (sorted keys, defaults left out), so every
+    // client shares one browser/CDN cache entry per search; the server 308s other spellings
+    function cacheableUrl(path, params) {
+        const entries = Object.entries({ ...params, fields: FIELDS }).filter(([, v]) => v !== null && v !== undefined && v !== '');
+        return `${API_URL}${path}?${new URLSearchParams(entries.sort(([a], [b]) => (a < b ? -1 : 1)))}`;
+    }
+
+    function searchFilters() {
+        return {
+            type: CURRENT_FILTER === 'ALL' ? null : CURRENT_FILTER,
+            sort: CURRENT_SORT === 'RATING' ? 'rating' : 'relevance'
+        };
+    }
+
     async function performSearch() {
         const query = document.getElementById('search-input').value;
         if (!query) return;
         addToHistory(query);
+        NEXT_CURSOR = null;
         const grid = document.getElementById('results-grid');
         grid.innerHTML = `<h2 style="grid-column:1/-1;text-align:center;color:var(--neon-blue);animation:pulse 1s infinite;">NEURAL SCAN IN PROGRESS...</h2>`;
         try {
-            const endpoint = AUTH_TOKEN ? "/recommend/personalized" : "/recommend";
-            const res = await fetch(`${API_URL}${endpoint}`, {
-                method: "POST",
-                headers: { "Content-Type": "application/json", ...(AUTH_TOKEN && { "Authorization": `Bearer ${AUTH_TOKEN}` }) },
-                body: JSON.stringify({ text: query, top_k: 12, model: CURRENT_MODEL })
-            });
+            // God Mode: render each tile as soon as the LLM finishes writing it
+            if (CURRENT_MODEL === 'api') {
+                const res = await fetch(`${API_URL}/recommend/stream?${CARD_FIELDS}`, {
+                    method: "POST",
+                    headers: { "Content-Type": "application/json" },
+                    body: JSON.stringify({ text: query, top_k: 12, model: CURRENT_MODEL, ...searchFilters() })
+                });
+                if (!res.ok || !res.body) throw new Error("API Error");
+                NEXT_CURSOR = res.headers.get("X-Next-Cursor");
+                lastSearchData = await readTileStream(res, (tiles) => { lastSearchData = tiles; renderResults(tiles); });
+                if (!lastSearchData.length) renderResults(lastSearchData);
+                return;
+            }
+
+            const filters = searchFilters();
+            const text = query.toLowerCase().split(/\s+/).filter(Boolean).join(' ');
+            const res = AUTH_TOKEN
+                ? await fetch(`${API_URL}/recommend/personalized?${CARD_FIELDS}`, {
+                    method: "POST",
+                    headers: { "Content-Type": "application/json", "Authorization": `Bearer ${AUTH_TOKEN}` },
+                    body: JSON.stringify({ text: query, top_k: 12, model: CURRENT_MODEL, ...filters })
+                })
+                : await fetch(cacheableUrl("/recommend", { text, type: filters.type, sort: filters.sort === 'rating' ? 'rating' : null }));
 
             // ✅ FIX: Detect Invalid Token (401) and Auto-Logout
             if (res.status === 401) {
@@ -206,6 +258,7 @@ document.addEventListener("DOMContentLoaded", () => {
 
             if (!res.ok) throw new Error("API Error");
 
+            NEXT_CURSOR = res.headers.get("X-Next-Cursor");
             const data = await res.json(); lastSearchData = data; renderResults(data);
         } catch (e) {
             console.error(e);
@@ -213,6 +266,35 @@ document.addEventListener("DOMContentLoaded", () => {
         }
     }
 
+    // Infinite scroll: the cursor replays the same query from the cached vector, one page per call
+    async function loadMore() {
+        const fb = document.getElementById('filter-bar');
+        if (!NEXT_CURSOR || LOADING_MORE || !fb || fb.style.display === 'none') return; // only on the search grid
+        LOADING_MORE = true;
+        const cursor = NEXT_CURSOR;
+        try {
+            const res = AUTH_TOKEN // same taste blend as page one
+                ? await fetch(`${API_URL}/recommend/personalized?${CARD_FIELDS}`, {
+                    method: "POST",
+                    headers: { "Content-Type": "application/json", "Authorization": `Bearer ${AUTH_TOKEN}` },
+                    body: JSON.stringify({ cursor })
+                })
+                : await fetch(cacheableUrl("/recommend", { cursor }));
+            if (!res.ok || cursor !== NEXT_CURSOR) return; // failed, or a new search started meanwhile
+            NEXT_CURSOR = res.headers.get("X-Next-Cursor");
+            const seen = new Set(lastSearchData.map(item => String(item.id)));
+            const fresh = (await res.json()).filter(item => !seen.has(String(item.id)));
+            if (fresh.length) { lastSearchData = lastSearchData.concat(fresh); renderResults(lastSearchData); }
+        } catch (e) {
+            console.error(e);
+        } finally {
+            LOADING_MORE = false;
+        }
+    }
+    window.addEventListener('scroll', () => {
+        if (window.innerHeight + window.scrollY >= document.body.offsetHeight - 600) loadMore();
+    });
+
     function renderResults(data, isSimilarView = false) {
         const grid = document.getElementById('results-grid'); grid.innerHTML = "";
         if (!isSimilarView && data.length > 0) renderFilters();
@@ -251,7 +333,7 @@ document.addEventListener("DOMContentLoaded", () => {
             const exploreBtn = isSimilarView ? '' : `<button class="similar-btn" onclick="window.findSimilar('${item.id}', '${safeTitle}')">EXPLORE SIMILAR</button>`;
 
             card.innerHTML = `
-                <div class="card-media-wrapper"><img src="${imgUrl}" loading="lazy" onload="this.classList.add('loaded')"><div class="match-bar-track"><span class="match-label-base label-cyan">${item.score || 85}% MATCH</span></div></div>
+                <div class="card-media-wrapper"><img src="${imgUrl}" loading="lazy" onload="this.classList.add('loaded')"><div class="match-bar-track"><span class="match-label-base label-cyan">${item.score ? `${item.score}% MATCH` : (CURRENT_SORT === 'RATING' ? 'TOP RATED' : '85% MATCH')}</span></div></div>
                 <div class="card-content">
                     <div class="badge-row">
                         <span class="type-badge type-${typeClass}">${type}</span>
@@ -270,14 +352,14 @@ document.addEventListener("DOMContentLoaded", () => {
         CURRENT_FILTER = type;
         document.querySelectorAll('.filter-btn').forEach(b => b.classList.remove('active'));
         document.getElementById(`btn-${type.toLowerCase()}`).classList.add('active');
-        renderResults(lastSearchData);
+        performSearch();
     };
     window.toggleSort = () => {
         CURRENT_SORT = (CURRENT_SORT === 'RELEVANCE') ? 'RATING' : 'RELEVANCE';
         const btn = document.getElementById('btn-sort');
         btn.innerText = `SORT: ${CURRENT_SORT}`;
         btn.classList.toggle('active');
-        renderResults(lastSearchData);
+        performSearch();
     };
 
     function renderFilters() {
@@ -316,7 +398,7 @@ document.addEventListener("DOMContentLoaded", () => {
         const grid = document.getElementById('results-grid');
         const fb = document.getElementById('filter-bar'); if (fb) fb.style.display = 'none';
         grid.innerHTML = `<h2 style="grid-column:1/-1;text-align:center;">VECTOR TRIANGULATION...</h2>`;
-        const res = await fetch(`${API_URL}/similar`, { method: "POST", headers: { "Content-Type": "application/json" }, body: JSON.stringify({ id }) });
+        const res = await fetch(cacheableUrl("/similar", { id }));
         const data = await res.json();
         renderResults(data, true);
         const backBtn = document.createElement("button"); backBtn.innerText = "← RETURN TO SEARCH"; backBtn.className = "back-btn";
@@ -330,7 +412,7 @@ document.addEventListener("DOMContentLoaded", () => {
         const fb = document.getElementById('filter-bar'); if (fb) fb.style.display = 'none';
         if (!AUTH_TOKEN) { grid.innerHTML = `<h3 style="text-align:center;grid-column:1/-1;color:var(--text-secondary);margin-top:50px;">PLEASE LOGIN TO VIEW WISHLIST</h3>`; return; }
         grid.innerHTML = `<h2 style="grid-column:1/-1;text-align:center;">LOADING WISHLIST...</h2>`;
-        fetch(`${API_URL}/wishlist`, { headers: { "Authorization": `Bearer ${AUTH_TOKEN}` } })
+        fetch(`${API_URL}/wishlist?${CARD_FIELDS}`, { headers: { "Authorization": `Bearer ${AUTH_TOKEN}` } })
             .then(res => res.json()).then(data => {
                 if (!data || data.length === 0) { grid.innerHTML = `<h3 style="text-align:center;grid-column:1/-1;margin-top:50px;">YOUR WISHLIST IS EMPTY</h3>`; }
                 else { renderResults(data, true); }
@@ -363,7 +445,7 @@ document.addEventListener("DOMContentLoaded", () => {
         if (AUTH_TOKEN) {
             document.getElementById('nav-auth').innerText = "LOGOUT"; document.getElementById('nav-auth').onclick = window.logout;
             document.getElementById('hud-user').innerText = CURRENT_USER;
-            const res = await fetch(`${API_URL}/wishlist`, { headers: { "Authorization": `Bearer ${AUTH_TOKEN}` } });
+            const res = await fetch(`${API_URL}/wishlist?fields=id`, { headers: { "Authorization": `Bearer ${AUTH_TOKEN}` } });
 
             // ✅ FIX: Check Token on Boot
             if (res.status === 401) {
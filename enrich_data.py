@@ -1,8 +1,15 @@
 import pandas as pd
 import requests
-import time
+import json
 import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
 from dotenv import load_dotenv
+from backend.cache import normalize_text
+from backend.ratelimit import TokenBucket
 
 # ==========================================
 #  CONFIGURATION
@@ -12,114 +19,192 @@ load_dotenv()  # Load keys from .env
 TMDB_API_KEY = os.getenv("TMDB_API_KEY")
 INPUT_FILE = "dataset.csv"
 OUTPUT_FILE = "dataset_enriched.csv"
+CACHE_FILE = "enrich_cache.db"
 
-if not TMDB_API_KEY:
-    print("❌ ERROR: TMDB_API_KEY not found in .env file.")
-    exit()
+# Concurrent lookups; each host is paced by its own token bucket.
+# Jikan allows ~3 req/s (60/min); TMDB ~40-50 req/s.
+WORKERS = int(os.getenv("ENRICH_WORKERS", "16"))
+CHUNK_SIZE = int(os.getenv("ENRICH_CHUNK_SIZE", "200"))  # rows per append to OUTPUT_FILE
+JIKAN_BUCKET = TokenBucket(rate=float(os.getenv("JIKAN_RATE", "1")), capacity=3)
+TMDB_BUCKET = TokenBucket(rate=float(os.getenv("TMDB_RATE", "40")), capacity=40)
+
+# ==========================================
+#  RESPONSE CACHE
+# ==========================================
+class ResponseCache:
+    """Persistent (source, normalized title) -> lookup result.
+
+    Definitive answers are stored, including "not found" (None), so reruns
+    never re-query a solved title. Network errors are not cached.
+    """
+
+    def __init__(self, path):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "source TEXT NOT NULL, key TEXT NOT NULL, data TEXT, fetched REAL NOT NULL, "
+            "PRIMARY KEY (source, key)) WITHOUT ROWID"
+        )
+        self._db.commit()
+        self._lock = threading.Lock()
+
+    def get(self, source, title):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT data FROM responses WHERE source = ? AND key = ?", (source, normalize_text(title))
+            ).fetchone()
+        if row is None: return False, None
+        return True, json.loads(row[0]) if row[0] else None
+
+    def set(self, source, title, data):
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses (source, key, data, fetched) VALUES (?, ?, ?, ?)",
+                (source, normalize_text(title), json.dumps(data) if data else None, time.time()),
+            )
+            self._db.commit()
+
+cache = ResponseCache(CACHE_FILE)
 
 # ==========================================
 #  API HELPERS
 # ==========================================
+# Each helper returns (ok, data): ok=False means "transient failure, ask again next run".
+
 def fetch_anime_jikan(title):
     """Fetches Anime data from MyAnimeList via Jikan (Free, No Key)"""
     try:
-        url = f"https://api.jikan.moe/v4/anime?q={title}&limit=1"
+        JIKAN_BUCKET.acquire()  # Jikan has strict rate limits
+        url = f"https://api.jikan.moe/v4/anime?q={quote(str(title))}&limit=1"
         res = requests.get(url, timeout=10)
         if res.status_code == 200:
             data = res.json().get('data', [])
-            if data:
-                item = data[0]
-                return {
-                    'image': item['images']['jpg']['large_image_url'],
-                    'rating': item.get('score', 0),
-                    'description': item.get('synopsis', '').replace('\n', ' ')
-                }
-        time.sleep(1.2) # Jikan has strict rate limits
+            if not data: return True, None
+            item = data[0]
+            return True, {
+                'image': item['images']['jpg']['large_image_url'],
+                'rating': item.get('score', 0),
+                'description': (item.get('synopsis') or '').replace('\n', ' ')
+            }
     except Exception as e:
         pass
-    return None
+    return False, None
 
 def fetch_movie_tmdb(title, type_hint="movie"):
     """Fetches Movie/TV data from TMDB (Credible Source)"""
     try:
+        TMDB_BUCKET.acquire()
         search_type = "tv" if "tv" in str(type_hint).lower() else "movie"
-        url = f"https://api.themoviedb.org/3/search/{search_type}?api_key={TMDB_API_KEY}&query={title}"
+        url = f"https://api.themoviedb.org/3/search/{search_type}?api_key={TMDB_API_KEY}&query={quote(str(title))}"
         res = requests.get(url, timeout=5)
-        
+
         if res.status_code == 200:
             results = res.json().get('results', [])
-            if results:
-                item = results[0]
-                poster = item.get('poster_path')
-                img_url = f"https://image.tmdb.org/t/p/w500{poster}" if poster else None
-                desc = item.get('overview', '')
-                rating = item.get('vote_average', 0)
-                
-                return {'image': img_url, 'rating': rating, 'description': desc}
+            if not results: return True, None
+            item = results[0]
+            poster = item.get('poster_path')
+            img_url = f"https://image.tmdb.org/t/p/w500{poster}" if poster else None
+            desc = item.get('overview', '')
+            rating = item.get('vote_average', 0)
+
+            return True, {'image': img_url, 'rating': rating, 'description': desc}
     except Exception:
         pass
-    return None
+    return False, None
+
+def lookup(source, title, fetch):
+    hit, data = cache.get(source, title)
+    if hit: return data
+    ok, data = fetch()
+    if ok: cache.set(source, title, data)
+    return data
 
 # ==========================================
-#  MAIN LOOP
+#  ROW LOGIC
 # ==========================================
-print(f"🚀 Starting Deep Scan for {INPUT_FILE}...")
-try:
-    df = pd.read_csv(INPUT_FILE)
-except:
-    print("❌ dataset.csv not found!")
-    exit()
-
-df = df.fillna("")
-fixed_count = 0
-
-for index, row in df.iterrows():
-    needs_fix = False
-    
+def needs_fix(row):
     # 1. BAD IMAGE
     curr_img = str(row['image']).lower()
     if not curr_img or "placeholder" in curr_img or "n/a" in curr_img or "nan" in curr_img:
-        needs_fix = True
-        
+        return True
+
     # 2. BAD DESCRIPTION
     curr_desc = str(row['description']).strip().lower()
     if not curr_desc or len(curr_desc) < 20 or "no description" in curr_desc:
-        needs_fix = True
-        
+        return True
+
     # 3. BAD RATING
     try:
         curr_rate = float(row['rating'])
     except:
         curr_rate = 0.0
-    if curr_rate <= 0.1:
-        needs_fix = True
-
-    if needs_fix:
-        title = row['title']
-        m_type = row['type']
-        
-        # Decide which DB to check
-        is_anime = "anime" in str(m_type).lower() or "anime" in str(row.get('genre', '')).lower()
-        print(f"[{index}/{len(df)}] Scanning: {title[:30]}...", end="\r")
-        
-        new_data = None
-        if is_anime:
-            new_data = fetch_anime_jikan(title)
-        else:
-            new_data = fetch_movie_tmdb(title, m_type)
-            
-        if new_data:
-            if new_data['image']: df.at[index, 'image'] = new_data['image']
-            if new_data['description']: df.at[index, 'description'] = new_data['description']
-            if new_data['rating']: df.at[index, 'rating'] = new_data['rating']
-            fixed_count += 1
-
-    # Autosave every 50 items
-    if index > 0 and index % 50 == 0:
-        df.to_csv(OUTPUT_FILE, index=False)
-
-# Final Save
-df.to_csv(OUTPUT_FILE, index=False)
-print(f"\n✅ SCAN COMPLETE! Fixed {fixed_count} items.")
-print(f"💾 Saved to '{OUTPUT_FILE}'.")
-print("👉 INSTRUCTIONS: Delete 'dataset.csv', rename 'dataset_enriched.csv' to 'dataset.csv', and run 'ingest.py' again.")
\ No newline at end of file
+    return curr_rate <= 0.1
+
+def enrich_row(row):
+    """Returns the fields to overwrite for one row ({} if nothing to fix or nothing found)."""
+    if not needs_fix(row): return {}
+    title = row['title']
+    m_type = row['type']
+
+    # Decide which DB to check
+    is_anime = "anime" in str(m_type).lower() or "anime" in str(row.get('genre', '')).lower()
+    if is_anime:
+        new_data = lookup("jikan", title, lambda: fetch_anime_jikan(title))
+    else:
+        search_type = "tv" if "tv" in str(m_type).lower() else "movie"
+        new_data = lookup(f"tmdb-{search_type}", title, lambda: fetch_movie_tmdb(title, m_type))
+
+    if not new_data: return {}
+    return {k: new_data[k] for k in ('image', 'description', 'rating') if new_data.get(k)}
+
+# ==========================================
+#  MAIN LOOP
+# ==========================================
+def main():
+    if not TMDB_API_KEY:
+        print("❌ ERROR: TMDB_API_KEY not found in .env file.")
+        exit()
+
+    print(f"🚀 Starting Deep Scan for {INPUT_FILE}...")
+    try:
+        df = pd.read_csv(INPUT_FILE)
+    except:
+        print("❌ dataset.csv not found!")
+        return
+
+    df = df.fillna("")
+
+    # Append-only output: rows already written by a previous run are not redone
+    done_rows = 0
+    if os.path.exists(OUTPUT_FILE):
+        try:
+            done_rows = len(pd.read_csv(OUTPUT_FILE, usecols=[0]))
+        except Exception:
+            done_rows = 0
+        if not done_rows: os.remove(OUTPUT_FILE)  # empty or unreadable: start over
+    if done_rows: print(f"ℹ️  Resuming after {done_rows} rows already in '{OUTPUT_FILE}'.")
+
+    fixed_count = 0
+    started = time.time()
+
+    with ThreadPoolExecutor(max_workers=WORKERS) as pool:
+        for start in range(done_rows, len(df), CHUNK_SIZE):
+            chunk = df.iloc[start:start + CHUNK_SIZE].copy()
+            rows = [row for _, row in chunk.iterrows()]
+            for index, fixes in zip(chunk.index, pool.map(enrich_row, rows)):
+                for col, val in fixes.items(): chunk.at[index, col] = val
+                if fixes: fixed_count += 1
+
+            chunk.to_csv(OUTPUT_FILE, mode="a", header=(start == 0), index=False)
+            done = start + len(chunk)
+            rate = (done - done_rows) / max(time.time() - started, 1e-9)
+            print(f"[{done}/{len(df)}] Fixed {fixed_count} | {rate:.1f} rows/sec", end="\r")
+
+    print(f"\n✅ SCAN COMPLETE! Fixed {fixed_count} items.")
+    print(f"💾 Saved to '{OUTPUT_FILE}'.")
+    print("👉 INSTRUCTIONS: Delete 'dataset.csv', rename 'dataset_enriched.csv' to 'dataset.csv', and run 'ingest.py' again.")
+    print("👉 OR: run 'pipeline.py' to enrich, embed and upload in a single streaming pass.")
+
+if __name__ == "__main__":
+    main()
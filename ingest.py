@@ -1,7 +1,12 @@
+import argparse
 import pandas as pd
 from qdrant_client import QdrantClient, models
-from sentence_transformers import SentenceTransformer
+from backend.catalog import build_col_map, normalize_columns, prepare_frame, record_id, search_texts
+from backend.collection import bump_version, content_hash, create_version, delete_points, ensure_collection, existing_hashes, swap_alias
+from backend.embedder import get_embedder
+from concurrent.futures import ThreadPoolExecutor, wait
 import os
+import time
 from dotenv import load_dotenv
 
 # --- CONFIGURATION (CLOUD VS LOCAL) ---
@@ -10,117 +15,108 @@ load_dotenv() # Load keys from .env
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 
+# Rows read, typed and embedded per step (bounds memory), points per upload call
+CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "5000"))
+BATCH_SIZE = 100
+UPLOAD_PARALLEL = int(os.getenv("INGEST_UPLOAD_PARALLEL", "4"))
+
+parser = argparse.ArgumentParser(description="Sync dataset.csv into Qdrant.")
+parser.add_argument("--rebuild", action="store_true",
+                    help="embed everything into a new versioned collection and swap the alias (default: delta update)")
+parser.add_argument("--profile", default=None,
+                    help="collection profile for --rebuild (see backend/profiles.py; default COLLECTION_PROFILE)")
+args = parser.parse_args()
+
 if QDRANT_URL and QDRANT_API_KEY:
     print(f"☁️ CONNECTING TO QDRANT CLOUD: {QDRANT_URL}")
     client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
 else:
     print("📁 USING LOCAL STORAGE (qdrant_storage)")
     # Local Mode: Saves to folder so we don't need Docker
-    client = QdrantClient(path="qdrant_storage") 
+    client = QdrantClient(path="qdrant_storage")
+    UPLOAD_PARALLEL = 1  # embedded storage is single-writer
 
-model = SentenceTransformer("all-MiniLM-L6-v2")
-COLLECTION_NAME = "freeme_collection"
+embedder = get_embedder()  # same model as the /recommend query path
+COLLECTION_NAME = "freeme_collection"  # alias; the data lives in freeme_collection_v<ts>
 
 # --- HELPERS ---
-def find_col(df, candidates):
-    for col in candidates:
-        if col in df.columns: return col
-    return None
+def upload(target, points):
+    client.upload_points(collection_name=target, points=points)
+    return len(points)
 
 # --- MAIN ---
 if not os.path.exists("dataset.csv"):
     print("❌ ERROR: dataset.csv missing.")
     exit()
 
-print("📊 Reading dataset...")
+print("📊 Reading dataset header...")
 try:
-    df = pd.read_csv("dataset.csv")
-    df.columns = [c.strip().lower().replace(" ", "_") for c in df.columns]
-    
-    col_map = {}
-    
-    # Map standard columns
-    t_col = find_col(df, ['title', 'show_title', 'name', 'series_title'])
-    if t_col: col_map[t_col] = 'title'
-    
-    d_col = find_col(df, ['description', 'synopsis', 'plot', 'summary', 'desc'])
-    if d_col: col_map[d_col] = 'description'
-    
-    i_col = find_col(df, ['image', 'img_url', 'poster', 'cover', 'poster_link', 'picture'])
-    if i_col: col_map[i_col] = 'image'
-    
-    r_col = find_col(df, ['rating', 'score', 'imdb_score', 'vote_average'])
-    if r_col: col_map[r_col] = 'rating'
-    
-    y_col = find_col(df, ['year', 'release_year', 'date', 'aired'])
-    if y_col: col_map[y_col] = 'year'
-
-    # Important: Capture Genre to detect Docs/Anime
-    g_col = find_col(df, ['genre', 'listed_in', 'category', 'genres'])
-    if g_col: col_map[g_col] = 'genre'
-
-    ty_col = find_col(df, ['type', 'media_type', 'content_type'])
-    if ty_col: col_map[ty_col] = 'type'
-
-    df = df.rename(columns=col_map)
-    
-    # Fill missing
-    for std_col in ['title', 'description', 'image', 'rating', 'year', 'type', 'genre']:
-        if std_col not in df.columns: df[std_col] = "N/A"
-
-    df = df.fillna("") 
-    print(f"✅ Columns mapped. Processing {len(df)} items...")
-
+    header = normalize_columns(pd.read_csv("dataset.csv", nrows=0))
+    col_map = build_col_map(header)
+    print(f"✅ Columns mapped: {col_map}")
 except Exception as e:
     print(f"❌ CSV Error: {e}")
     exit()
 
-print(f"⚙️ Resetting DB '{COLLECTION_NAME}'...")
-try:
-    if client.collection_exists(COLLECTION_NAME):
-        client.delete_collection(COLLECTION_NAME)
-except Exception as e:
-    # Some cloud instances throw error if checking existence differently, safe to ignore
-    pass
-
-client.create_collection(
-    collection_name=COLLECTION_NAME,
-    vectors_config=models.VectorParams(size=384, distance=models.Distance.COSINE),
-)
-
-print("🚀 Embedding Data...")
-
-points = []
-BATCH_SIZE = 100 
-
-for idx, row in df.iterrows():
-    # [SMART LOGIC] Force correct types based on Genre text
-    real_type = str(row['type']).title()
-    genre_text = str(row['genre']).lower()
-    
-    if "documentary" in genre_text or "doc" in genre_text:
-        real_type = "Documentary"
-    elif "anime" in genre_text:
-        real_type = "Anime"
-    elif "stand-up" in genre_text:
-        real_type = "Stand-Up"
-
-    # Rich Text Embedding
-    search_text = f"{row['title']} {row['description']} {row['genre']} {real_type}"
-    vector = model.encode(search_text).tolist()
-    
-    # Update payload
-    payload = row.to_dict()
-    payload['type'] = real_type # Save the corrected type
-    
-    points.append(models.PointStruct(id=idx, vector=vector, payload=payload))
-
-    if len(points) >= BATCH_SIZE:
-        client.upload_points(collection_name=COLLECTION_NAME, points=points)
-        points = []
-        if idx % 1000 == 0: print(f"   Uploaded {idx} / {len(df)}")
-
-if points:
-    client.upload_points(collection_name=COLLECTION_NAME, points=points)
-
-print(f"✅ DONE! All items ingested into {('CLOUD' if QDRANT_URL else 'LOCAL')}.")
\ No newline at end of file
+# Delta: diff against the live collection. Rebuild: fill a fresh version, swap at the end.
+if args.rebuild:
+    target = create_version(client, COLLECTION_NAME, args.profile)
+    known = {}
+    print(f"⚙️ Full rebuild into '{target}' (live alias untouched until the swap)...")
+else:
+    target = ensure_collection(client, COLLECTION_NAME)
+    known = existing_hashes(client, target)
+    print(f"⚙️ Delta update of '{target}' ({len(known)} points already stored)...")
+
+print(f"🚀 Embedding Data in chunks of {CHUNK_SIZE} ({UPLOAD_PARALLEL} parallel uploads)...")
+
+started = time.time()
+processed = 0
+embedded = 0
+seen = set()
+duplicates = 0
+in_flight = []  # uploads of the previous chunk overlap with embedding of this one
+
+with ThreadPoolExecutor(max_workers=UPLOAD_PARALLEL) as pool:
+    for chunk in pd.read_csv("dataset.csv", chunksize=CHUNK_SIZE):
+        df = prepare_frame(chunk, col_map)
+        records = df.to_dict("records")
+        texts = search_texts(df).tolist()
+
+        # Ids come from title + year + type so the same show keeps its point across runs
+        changed = []
+        for record, text in zip(records, texts):
+            pid = record_id(record)
+            if pid in seen:  # same title, year and type twice in the CSV: first row wins
+                duplicates += 1
+                continue
+            seen.add(pid)
+            record['content_hash'] = content_hash(record)
+            if known.get(pid) != record['content_hash']: changed.append((pid, record, text))
+
+        vectors = embedder.embed([text for _, _, text in changed]) if changed else []
+        points = [
+            models.PointStruct(id=pid, vector=vector, payload=record)
+            for (pid, record, _), vector in zip(changed, vectors) if vector
+        ]
+
+        # Keep at most one chunk of uploads queued: memory stays bounded
+        wait(in_flight)
+        for f in in_flight: f.result()
+        in_flight = [pool.submit(upload, target, points[i:i + BATCH_SIZE]) for i in range(0, len(points), BATCH_SIZE)]
+
+        processed += len(df)
+        embedded += len(points)
+        elapsed = time.time() - started
+        print(f"   Scanned {processed} rows | embedded {embedded} | {processed / elapsed:.1f} rows/sec")
+
+    wait(in_flight)
+    for f in in_flight: f.result()
+
+if duplicates: print(f"⚠️  {duplicates} duplicate rows (same title, year and type) skipped.")
+removed = delete_points(client, target, set(known) - seen)
+if embedded or removed: bump_version(client, target)  # API neighbor/HTTP caches key on this
+if args.rebuild: swap_alias(client, COLLECTION_NAME, target)
+
+elapsed = time.time() - started
+print(f"✅ DONE! {processed} rows scanned, {embedded} embedded/updated, {removed} removed in {('CLOUD' if QDRANT_URL else 'LOCAL')} in {elapsed:.1f}s ({processed / max(elapsed, 1e-9):.1f} rows/sec).")
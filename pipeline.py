@@ -0,0 +1,201 @@
+import argparse
+import os
+import queue
+import threading
+import time
+import pandas as pd
+from dotenv import load_dotenv
+from qdrant_client import QdrantClient, models
+from backend.catalog import build_col_map, normalize_columns, prepare_frame, record_id, search_text
+from backend.collection import bump_version, content_hash, ensure_collection
+from backend.embedder import EMBED_BATCH_SIZE, VECTOR_SIZE, get_embedder
+
+# ==========================================
+#  CONFIGURATION
+# ==========================================
+# read CSV -> normalize -> enrich -> embed -> upsert, each stage on its own
+# threads, joined by bounded queues: memory stays constant and network
+# (enrich, upsert) overlaps with CPU (embed).
+load_dotenv()
+
+QDRANT_URL = os.getenv("QDRANT_URL")
+QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
+COLLECTION_NAME = "freeme_collection"  # alias, see backend/collection.py
+
+DONE = object()  # end-of-stream marker passed down the queues
+
+# ==========================================
+#  STAGE RUNNER
+# ==========================================
+class Stage:
+    """`workers` threads applying `fn` to batches from `inbox`, results go to `outbox`.
+
+    `fn` returns the batch to forward (or None to drop it). When every worker
+    has seen DONE, the stage forwards a single DONE downstream.
+    """
+
+    def __init__(self, name, fn, inbox, outbox, workers=1):
+        self.name = name
+        self.fn = fn
+        self.inbox = inbox
+        self.outbox = outbox
+        self.workers = workers
+        self.rows = 0
+        self.busy = 0.0
+        self.error = None
+        self._alive = workers
+        self._lock = threading.Lock()
+        self._threads = [threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+
+    def start(self):
+        for t in self._threads: t.start()
+
+    def join(self):
+        for t in self._threads: t.join()
+
+    def _work(self):
+        while True:
+            batch = self.inbox.get()
+            if batch is DONE:
+                self.inbox.put(DONE)  # let sibling workers see it too
+                break
+            start = time.perf_counter()
+            try:
+                out = self.fn(batch)
+            except Exception as e:
+                print(f"\n❌ {self.name} failed on a batch of {len(batch)}: {e}")
+                self.error = e
+                out = None
+            with self._lock:
+                self.busy += time.perf_counter() - start
+                self.rows += len(batch)
+            if out and self.outbox is not None: self.outbox.put(out)
+        with self._lock:
+            self._alive -= 1
+            last = self._alive == 0
+        if last and self.outbox is not None: self.outbox.put(DONE)
+
+    def stats(self, elapsed):
+        return f"{self.name}: {self.rows} rows, {self.rows / max(elapsed, 1e-9):.1f}/s, busy {self.busy:.1f}s"
+
+# ==========================================
+#  STAGES
+# ==========================================
+def read_csv(path, batch_size, outbox, limit=None, errors=None):
+    """Always ends the stream with DONE; a read / parse error is appended to `errors` for main()."""
+    try:
+        header = normalize_columns(pd.read_csv(path, nrows=0))
+        col_map = build_col_map(header)
+        print(f"✅ Columns mapped: {col_map}")
+        sent = 0
+        for chunk in pd.read_csv(path, chunksize=batch_size):
+            df = prepare_frame(chunk, col_map)
+            records = df.to_dict("records")
+            if limit is not None: records = records[:limit - sent]
+            # Hash the CSV row as ingest.py does (before enrichment): a later delta
+            # run then sees these rows as current and keeps the enriched payload
+            for r in records: r['content_hash'] = content_hash(r)
+            outbox.put(records)  # blocks while downstream is full
+            sent += len(records)
+            if limit is not None and sent >= limit: break
+    except Exception as e:
+        print(f"\n❌ Reading {path} failed: {e}")
+        if errors is not None: errors.append(e)
+    finally:
+        outbox.put(DONE)  # otherwise every stage (and the monitor loop) waits forever
+
+def make_enrich():
+    # enrich_data opens its response cache on import; only pay for it when enriching
+    import enrich_data
+
+    def enrich(records):
+        for record in records:
+            for col, val in enrich_data.enrich_row(record).items(): record[col] = val
+        return records
+    return enrich
+
+def make_embed(embedder):
+    def embed(records):
+        vectors = embedder.embed([search_text(r) for r in records])
+        return [
+            models.PointStruct(id=record_id(r), vector=v, payload=r)
+            for r, v in zip(records, vectors) if v and len(v) == VECTOR_SIZE
+        ]
+    return embed
+
+def make_upsert(client):
+    def upsert(points):
+        for attempt in range(5):
+            try:
+                client.upsert(collection_name=COLLECTION_NAME, points=points, wait=False)
+                return None
+            except Exception as e:
+                print(f"\n❌ Batch Upload Failed ({e}), retrying...")
+                time.sleep(2 * (attempt + 1))
+        raise RuntimeError(f"gave up on {len(points)} points")
+    return upsert
+
+# ==========================================
+#  MAIN
+# ==========================================
+def main():
+    parser = argparse.ArgumentParser(description="Stream dataset.csv into Qdrant: enrich -> embed -> upsert.")
+    parser.add_argument("--input", default="dataset.csv")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="rows per batch through every stage")
+    parser.add_argument("--queue-size", type=int, default=8, help="max batches waiting between two stages")
+    parser.add_argument("--enrich-workers", type=int, default=16)
+    parser.add_argument("--embed-workers", type=int, default=1)
+    parser.add_argument("--upsert-workers", type=int, default=4)
+    parser.add_argument("--no-enrich", action="store_true", help="skip TMDB/Jikan lookups")
+    parser.add_argument("--limit", type=int, default=None, help="stop after N rows")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"❌ ERROR: {args.input} missing.")
+        return
+
+    if QDRANT_URL and QDRANT_API_KEY:
+        print(f"☁️ CONNECTING TO QDRANT CLOUD: {QDRANT_URL}")
+        client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, timeout=60)
+    else:
+        print("📁 USING LOCAL STORAGE (qdrant_storage)")
+        client = QdrantClient(path="qdrant_storage")
+        args.upsert_workers = 1  # embedded storage is single-writer
+
+    target = ensure_collection(client, COLLECTION_NAME)
+
+    skip_enrich = args.no_enrich or not os.getenv("TMDB_API_KEY")
+    if skip_enrich: print("ℹ️  Enrichment disabled (--no-enrich or no TMDB_API_KEY).")
+
+    to_enrich, to_embed, to_upsert = (queue.Queue(maxsize=args.queue_size) for _ in range(3))
+    stages = [
+        Stage("enrich", (lambda records: records) if skip_enrich else make_enrich(), to_enrich, to_embed,
+              1 if skip_enrich else args.enrich_workers),
+        Stage("embed", make_embed(get_embedder()), to_embed, to_upsert, args.embed_workers),
+        Stage("upsert", make_upsert(client), to_upsert, None, args.upsert_workers),
+    ]
+
+    print(f"🚀 Streaming {args.input} in batches of {args.batch_size}...")
+    started = time.time()
+    for stage in stages: stage.start()
+    read_errors = []
+    reader = threading.Thread(target=read_csv, args=(args.input, args.batch_size, to_enrich, args.limit, read_errors), daemon=True)
+    reader.start()
+
+    while any(t.is_alive() for stage in stages for t in stage._threads):
+        time.sleep(5)
+        elapsed = time.time() - started
+        depths = f"queues {to_enrich.qsize()}/{to_embed.qsize()}/{to_upsert.qsize()}"
+        print(" | ".join(stage.stats(elapsed) for stage in stages) + f" | {depths}")
+
+    elapsed = time.time() - started
+    print("\n📊 PER-STAGE THROUGHPUT")
+    for stage in stages: print(f"   {stage.stats(elapsed)}")
+    failed = [stage.name for stage in stages if stage.error]
+    if failed: print(f"⚠️  Some batches failed in: {', '.join(failed)}")
+    if stages[-1].rows: bump_version(client, target)
+    if read_errors: raise read_errors[0]  # after the bump: the rows read so far are live
+    print(f"✅ DONE! {stages[-1].rows} points upserted in {elapsed:.1f}s.")
+
+if __name__ == "__main__":
+    main()
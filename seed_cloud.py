@@ -1,24 +1,22 @@
 import os
-import requests
-import time
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+from qdrant_client.models import PointStruct
+from backend.catalog import generate_id
+from backend.collection import bump_version, content_hash, delete_points, ensure_collection, existing_hashes
+from backend.embedder import EMBED_MODEL, VECTOR_SIZE, get_embedder
 
 # --- CONFIGURATION ---
-# We are switching to BAAI/bge-small-en-v1.5 (More stable for embeddings)
-MODEL_ID = "BAAI/bge-small-en-v1.5"
-HF_API_URL = f"https://router.huggingface.co/hf-inference/models/{MODEL_ID}"
+# Same embedder as the API (BAAI/bge-small-en-v1.5 by default)
+MODEL_ID = EMBED_MODEL
 COLLECTION_NAME = "freeme_collection"
-VECTOR_SIZE = 384
 
 load_dotenv()
 
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
-HF_TOKEN = os.getenv("HF_TOKEN")
 
-if not QDRANT_URL or not QDRANT_API_KEY or not HF_TOKEN:
+if not QDRANT_URL or not QDRANT_API_KEY:
     print("❌ Error: Missing credentials in .env file!")
     exit()
 
@@ -28,18 +26,10 @@ if QDRANT_URL.startswith("ttps://"):
 print(f"☁️ Connecting to: {QDRANT_URL}...")
 client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY)
 
-# 1. Re-Create Collection (Clean Slate)
-try:
-    client.delete_collection(COLLECTION_NAME)
-    print("🗑️  Deleted old collection.")
-except:
-    pass
-
-client.create_collection(
-    collection_name=COLLECTION_NAME,
-    vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE),
-)
-print(f"✅ Created fresh collection for {MODEL_ID}")
+# 1. Live collection behind the alias (created on first run, never dropped)
+target = ensure_collection(client, COLLECTION_NAME)
+known = existing_hashes(client, target)
+print(f"✅ Syncing '{target}' ({len(known)} points stored) for {MODEL_ID}")
 
 # 2. The Movie Data
 movies = [
@@ -55,50 +45,28 @@ movies = [
     {"title": "Avengers: Endgame", "description": "After the devastating events of Infinity War, the universe is in ruins. With the help of remaining allies, the Avengers assemble once more.", "type": "MOVIE", "rating": 8.4, "image": "https://image.tmdb.org/t/p/w500/or06FN3Dka5tukK1e9sl16pB3iy.jpg"}
 ]
 
-print(f"🚀 Uploading {len(movies)} movies...")
+# Only new or edited movies are embedded; stable ids come from the title
+for movie in movies: movie['content_hash'] = content_hash(movie)
+ids = [generate_id(movie['title']) for movie in movies]
+changed = [(pid, movie) for pid, movie in zip(ids, movies) if known.get(pid) != movie['content_hash']]
+print(f"🚀 Uploading {len(changed)} of {len(movies)} movies ({len(movies) - len(changed)} unchanged)...")
 
 points = []
-for i, movie in enumerate(movies):
-    text = f"{movie['title']} {movie['description']}"
-    
-    # Retry logic
-    vector = None
-    for attempt in range(3):
-        try:
-            # 🚨 Sending as a list [text] is crucial for this API
-            response = requests.post(
-                HF_API_URL, 
-                headers={"Authorization": f"Bearer {HF_TOKEN}"}, 
-                json={"inputs": [text]} 
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                # Handle nested list [[0.1, ...]]
-                if isinstance(data, list):
-                    if len(data) > 0 and isinstance(data[0], list):
-                        vector = data[0]
-                    else:
-                        vector = data
-                break
-            elif response.status_code == 503:
-                print("   ⏳ Model loading... waiting 3s")
-                time.sleep(3)
-            else:
-                print(f"   ❌ Error {response.status_code}: {response.text}")
-                break
-        except Exception as e:
-            print(f"   ❌ Connection Error: {e}")
-            break
-
+# One batched call for the changed seed set
+vectors = get_embedder().embed([f"{movie['title']} {movie['description']}" for _, movie in changed]) if changed else []
+for (pid, movie), vector in zip(changed, vectors):
     if vector and len(vector) == VECTOR_SIZE:
-        points.append(PointStruct(id=i+1, vector=vector, payload=movie))
+        points.append(PointStruct(id=pid, vector=vector, payload=movie))
         print(f"   ✅ Processed: {movie['title']}")
     else:
         print(f"   ⚠️ SKIPPED: {movie['title']} (Embedding Failed)")
 
 if points:
-    client.upsert(collection_name=COLLECTION_NAME, points=points)
+    client.upsert(collection_name=target, points=points)
     print(f"🎉 Success! {len(points)} movies uploaded to Qdrant Cloud.")
 else:
-    print("❌ No movies were uploaded.")
\ No newline at end of file
+    print("ℹ️  Nothing to upload.")
+
+removed = delete_points(client, target, set(known) - set(ids))
+if removed: print(f"🗑️  Removed {removed} movies no longer in the seed list.")
+if points or removed: bump_version(client, target)
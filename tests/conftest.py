@@ -0,0 +1,10 @@
+import os
+import sys
+
+# Offline defaults: no model download, no files written next to the real DB
+os.environ.setdefault("EMBED_BACKEND", "remote")
+os.environ.setdefault("EMBED_CACHE_PATH", "")
+os.environ.setdefault("DATABASE_URL", "sqlite+aiosqlite://")
+os.environ.setdefault("NEIGHBOR_GRAPH_PATH", "")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
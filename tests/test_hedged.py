@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+from fastapi import Response
+
+import backend.main as main
+
+
+def install_fakes(monkeypatch, vector_delay, llm_delay, llm_tiles=()):
+    calls = {"vector": 0}
+
+    async def vector_recommendations(text, top_k, flt=None, sort=None, offset=0, taste=None):
+        calls["vector"] += 1
+        await asyncio.sleep(vector_delay)
+        return [{"id": f"v{i}", "title": f"V{i}", "score": 50} for i in range(top_k)]
+
+    async def get_llm_recommendations(text):
+        await asyncio.sleep(llm_delay)
+        return [dict(tile) for tile in llm_tiles]
+
+    monkeypatch.setattr(main, "vector_recommendations", vector_recommendations)
+    monkeypatch.setattr(main, "get_llm_recommendations", get_llm_recommendations)
+    return calls
+
+
+def recommend(budget_ms):
+    req = main.UserRequest(text="slow burn thriller", model="api", top_k=3, budget_ms=budget_ms)
+    return asyncio.run(main._recommend(req, Response(), None))
+
+
+def test_hedged_runs_one_vector_search_when_the_llm_is_late(monkeypatch):
+    calls = install_fakes(monkeypatch, vector_delay=0.01, llm_delay=1)
+    page = recommend(budget_ms=100)
+    assert [item["id"] for item in page] == ["v0", "v1", "v2"]
+    assert calls["vector"] == 1
+
+
+def test_hedged_keeps_the_budget_when_both_are_late(monkeypatch):
+    calls = install_fakes(monkeypatch, vector_delay=0.5, llm_delay=1)
+    started = time.perf_counter()
+    assert recommend(budget_ms=100) == []
+    assert time.perf_counter() - started < 0.4
+    assert calls["vector"] == 1
+
+
+def test_hedged_llm_win_skips_the_fallback(monkeypatch):
+    calls = install_fakes(monkeypatch, vector_delay=0.5, llm_delay=0, llm_tiles=[{"id": "ai-1", "title": "A", "score": 99}])
+    assert [item["id"] for item in recommend(budget_ms=100)] == ["ai-1"]
+    assert calls["vector"] == 1
+
+
+def test_hedged_stream_cancelled_mid_stream_closes_the_llm_stream(monkeypatch):
+    install_fakes(monkeypatch, vector_delay=0, llm_delay=0)
+    closed = []
+
+    async def stream_llm_recommendations(text):
+        try:
+            yield {"id": "ai-1", "title": "A", "score": 99}
+            await asyncio.sleep(10)  # upstream stalls before the next tile
+            yield {"id": "ai-2", "title": "B", "score": 99}
+        finally:
+            closed.append(True)
+
+    monkeypatch.setattr(main, "stream_llm_recommendations", stream_llm_recommendations)
+
+    async def run():
+        got = []
+
+        async def consume():
+            async for tile in main.hedged_stream("x", 3, 1.0):
+                got.append(tile)
+
+        task = asyncio.ensure_future(consume())
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        return got
+
+    assert [tile["id"] for tile in asyncio.run(run())] == ["ai-1"]
+    assert closed == [True]
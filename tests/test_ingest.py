@@ -0,0 +1,44 @@
+import csv
+import runpy
+import sys
+
+import backend.embedder as embedder
+from backend.catalog import record_id
+
+ROOT = __file__.rsplit("/tests/", 1)[0]
+
+
+class FakeEmbedder:
+    def embed(self, texts):
+        return [[0.1] * embedder.VECTOR_SIZE for _ in texts]
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def test_same_title_rows_keep_their_own_points(tmp_path, monkeypatch, capsys):
+    rows = [
+        {"title": "Dune", "description": "Desert planet epic, spice and sandworms.", "year": 1984, "type": "MOVIE"},
+        {"title": "Dune", "description": "Desert planet epic, spice and sandworms.", "year": 2021, "type": "MOVIE"},
+        {"title": "Dune", "description": "The same 2021 film listed twice.", "year": 2021, "type": "MOVIE"},
+    ]
+    write_csv(tmp_path / "dataset.csv", rows)
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("QDRANT_URL", "")  # local storage under tmp_path
+    monkeypatch.setattr(sys, "argv", ["ingest.py"])
+    monkeypatch.setattr(embedder, "get_embedder", lambda *a, **k: FakeEmbedder())
+
+    script = runpy.run_path(f"{ROOT}/ingest.py")
+    client, target = script["client"], script["target"]
+    try:
+        stored = {p.id: p.payload["year"] for p in client.scroll(target, limit=10)[0]}
+    finally:
+        client.close()
+
+    assert sorted(stored.values()) == [1984, 2021]
+    assert record_id({"title": "Dune", "year": 1984, "type": "MOVIE"}) in stored
+    assert "1 duplicate rows" in capsys.readouterr().out
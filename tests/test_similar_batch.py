@@ -0,0 +1,35 @@
+import asyncio
+
+from qdrant_client import AsyncQdrantClient, models
+from qdrant_client.http.exceptions import UnexpectedResponse
+
+import backend.main as main
+
+
+def seeded_client():
+    client = AsyncQdrantClient(location=":memory:")
+
+    async def seed():
+        await client.create_collection(main.COLLECTION_NAME, vectors_config=models.VectorParams(size=2, distance=models.Distance.COSINE))
+        await client.upsert(main.COLLECTION_NAME, points=[
+            models.PointStruct(id=i, vector=[1.0, i / 10], payload={"title": f"T{i}", "type": "movie"}) for i in (1, 2, 3)
+        ])
+    asyncio.run(seed())
+    return client
+
+
+def test_unknown_id_only_empties_itself(monkeypatch):
+    client = seeded_client()
+
+    async def query_batch_points(**kwargs):  # what a server does when one id in the batch is missing
+        raise UnexpectedResponse(404, "Not Found", b'{"status":{"error":"No point with id 999 found"}}', None)
+
+    monkeypatch.setattr(client, "query_batch_points", query_batch_points)
+    monkeypatch.setattr(main, "get_qdrant", lambda: client)
+    main.neighbor_cache.clear()
+
+    req = main.SimilarBatchRequest(ids=["1", "999", "not-an-id"], top_k=2)
+    pages = asyncio.run(main.similar_batch(req))
+    assert [str(card["id"]) for card in pages["1"]] == ["2", "3"]
+    assert pages["999"] == []
+    assert pages["not-an-id"] == []
@@ -1,18 +1,20 @@
+import json
 import os
 import pandas as pd
-import requests
 import time
-import uuid
 from dotenv import load_dotenv
 from qdrant_client import QdrantClient
-from qdrant_client.models import VectorParams, Distance, PointStruct
+from qdrant_client.models import PointStruct
+from backend.catalog import generate_id, get_column_value
+from backend.collection import bump_version, create_version, ensure_collection, resolve_alias, swap_alias
+from backend.embedder import EMBED_BATCH_SIZE, VECTOR_SIZE, get_embedder
 
 # --- CONFIGURATION ---
 CSV_FILE = "dataset.csv"
-COLLECTION_NAME = "freeme_collection"
-HF_API_URL = "https://router.huggingface.co/hf-inference/models/BAAI/bge-small-en-v1.5"
-VECTOR_SIZE = 384
-BATCH_SIZE = 20  
+COLLECTION_NAME = "freeme_collection"  # alias, see backend/collection.py
+BATCH_SIZE = EMBED_BATCH_SIZE  # rows per embedding call AND per upsert
+CHECKPOINT_FILE = "upload_checkpoint.json"
+SCROLL_PAGE = 1000
 
 # Keep this FALSE so you resume where you left off
 RESET_COLLECTION = False 
@@ -21,9 +23,8 @@ load_dotenv()
 
 QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
-HF_TOKEN = os.getenv("HF_TOKEN")
 
-if not QDRANT_URL or not QDRANT_API_KEY or not HF_TOKEN:
+if not QDRANT_URL or not QDRANT_API_KEY:
     print("❌ Error: Missing credentials in .env file!")
     exit()
 
@@ -32,21 +33,51 @@ if QDRANT_URL.startswith("ttps://"):
 
 print(f"☁️ Connecting to Qdrant Cloud...")
 client = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, timeout=60)
+embedder = get_embedder()
 
-# 1. Handle Collection Reset
-if RESET_COLLECTION:
+def load_checkpoint():
     try:
-        client.delete_collection(COLLECTION_NAME)
-        print("🗑️  WIPED old collection.")
-    except:
-        pass
-    client.create_collection(
-        collection_name=COLLECTION_NAME,
-        vectors_config=VectorParams(size=VECTOR_SIZE, distance=Distance.COSINE),
-    )
-    print("✅ Created FRESH collection.")
+        with open(CHECKPOINT_FILE) as f: return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_checkpoint(next_row):
+    # Write-then-rename so a crash mid-write never corrupts the checkpoint
+    tmp = CHECKPOINT_FILE + ".tmp"
+    with open(tmp, "w") as f: json.dump({"next_row": next_row, "target": target, "updated": time.time()}, f)
+    os.replace(tmp, CHECKPOINT_FILE)
+
+# 1. Handle Collection Reset (a fresh version is filled while the live one keeps serving)
+checkpoint = load_checkpoint()
+if RESET_COLLECTION:
+    resumed = checkpoint.get("target")
+    if resumed and resumed != resolve_alias(client, COLLECTION_NAME) and client.collection_exists(resumed):
+        target = resumed  # an interrupted reset: keep filling the same version
+        print(f"ℹ️  Resuming FRESH collection '{target}'.")
+    else:
+        target = create_version(client, COLLECTION_NAME)
+        checkpoint = {}
+        save_checkpoint(0)  # remember the version before the first batch
+        print("✅ Created FRESH collection (swapped in once the upload finishes).")
 else:
-    print("ℹ️  Resume Mode: Checking for existing items...")
+    target = ensure_collection(client, COLLECTION_NAME)  # also adds any missing payload indexes
+    if checkpoint.get("target", target) != target: checkpoint = {}  # progress of an unfinished reset, not ours
+
+def load_existing_ids():
+    """Streams every point id (no payloads, no vectors) into a set: one pass instead of one retrieve per row."""
+    ids = set()
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=target, limit=SCROLL_PAGE, offset=offset,
+            with_payload=False, with_vectors=False,
+        )
+        ids.update(str(p.id) for p in points)
+        if offset is None: return ids
+
+print("ℹ️  Resume Mode: Loading existing ids...")
+existing_ids = load_existing_ids()
+print(f"   Found {len(existing_ids)} points already in '{target}'.")
 
 # 2. Load CSV
 if not os.path.exists(CSV_FILE):
@@ -56,45 +87,62 @@ if not os.path.exists(CSV_FILE):
 print(f"📖 Reading {CSV_FILE}...")
 df = pd.read_csv(CSV_FILE)
 
-def generate_id(title):
-    return str(uuid.uuid5(uuid.NAMESPACE_DNS, title.lower().strip()))
-
-def get_column_value(row, possible_names, default=""):
-    for name in possible_names:
-        for col in row.index:
-            if col.lower() == name.lower():
-                val = row[col]
-                if pd.isna(val) or val == "":
-                    return default
-                return val
-    return default
-
-print(f"📊 Found {len(df)} rows. Processing...")
+start_row = checkpoint.get("next_row", 0)
+print(f"📊 Found {len(df)} rows. Resuming at row {start_row}...")
 
 total_uploaded = 0
-points_batch = []
 skipped_count = 0
+failed_count = 0
+first_failed_row = None  # the checkpoint never moves past it, so a rerun retries the row
+pending = []  # (row, point_id, text, payload) waiting for one batched embedding call
+pending_ids = set()  # duplicate titles inside the current batch
+started = time.time()
+
+def flush(pending, next_row):
+    """Embeds one batch, upserts it and only then advances the checkpoint."""
+    global total_uploaded, failed_count, first_failed_row
+    vectors = embedder.embed([text for _, _, text, _ in pending])
+    points = []
+    for (row, point_id, _, payload), vector in zip(pending, vectors):
+        if vector and len(vector) == VECTOR_SIZE:
+            points.append(PointStruct(id=point_id, vector=vector, payload=payload))
+        else:
+            failed_count += 1
+            if first_failed_row is None: first_failed_row = row
+            print(f"   ⚠️ FAILED (retried on the next run): {payload['title']}")
+    for attempt in range(5):
+        try:
+            if points: client.upsert(collection_name=target, points=points)
+            break
+        except Exception as e:
+            print(f"❌ Batch Upload Failed: {e}")
+            time.sleep(10)
+    else:
+        print("❌ Giving up; rerun to resume from the last checkpoint.")
+        exit(1)
+    total_uploaded += len(points)
+    existing_ids.update(p.id for p in points)  # only once they are really stored
+    # Rows already stored before a failed one are skipped cheaply on resume (existing_ids)
+    save_checkpoint(next_row if first_failed_row is None else first_failed_row)
+    rate = total_uploaded / max(time.time() - started, 1e-9)
+    print(f"🚀 Uploaded batch! Total New: {total_uploaded} | Row {next_row}/{len(df)} | {rate:.1f} items/s")
 
 for index, row in df.iterrows():
+    if index < start_row: continue
+
     title = get_column_value(row, ['title', 'original_title', 'Series_Title', 'Name'], "Unknown")
     desc = get_column_value(row, ['overview', 'description', 'summary', 'plot'], "")
     rating = get_column_value(row, ['vote_average', 'rating', 'IMDB_Rating', 'Score'], 0)
     image = get_column_value(row, ['poster_path', 'poster', 'image', 'Poster_Link'], "")
     media_type = get_column_value(row, ['media_type', 'type', 'Genre'], "MOVIE")
+    year = get_column_value(row, ['release_year', 'year', 'Released_Year', 'release_date', 'first_air_date'], "")
 
     point_id = generate_id(str(title))
 
-    # Check existence
-    if not RESET_COLLECTION:
-        try:
-            # Quick check if ID exists
-            existing = client.retrieve(collection_name=COLLECTION_NAME, ids=[point_id])
-            if existing:
-                print(f"   ⏭️  Skipping existing: {title}")
-                skipped_count += 1
-                continue
-        except:
-            pass
+    # Check existence (in memory, no network)
+    if point_id in existing_ids or point_id in pending_ids:
+        skipped_count += 1
+        continue
 
     # Clean data
     image = str(image).strip()
@@ -102,66 +150,27 @@ for index, row in df.iterrows():
     if not desc or len(str(desc)) < 20 or str(desc).lower() == "no data.": continue 
     if not image or len(image) < 5 or "nan" in image.lower(): continue 
 
-    text = f"{title} {desc}"
-    vector = None
-    
-    # 🛡️ ROBUST RETRY LOOP (5 Attempts)
-    for attempt in range(5):
-        try:
-            response = requests.post(
-                HF_API_URL, 
-                headers={"Authorization": f"Bearer {HF_TOKEN}"}, 
-                json={"inputs": [text]},
-                timeout=15
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if isinstance(data, list):
-                    vector = data[0] if isinstance(data[0], list) else data
-                break # Success!
-            
-            # If server is busy or rate limited, WAIT.
-            elif response.status_code in [503, 429, 504]:
-                wait_time = (attempt + 1) * 5  # Wait 5s, then 10s, then 15s...
-                print(f"   ⏳ API Busy ({response.status_code}). Waiting {wait_time}s...")
-                time.sleep(wait_time)
-            else:
-                print(f"   ❌ API Error {response.status_code}: {response.text}")
-                break
-        except Exception as e:
-            print(f"   ❌ Connection Error. Retrying...")
-            time.sleep(5)
-    
-    if vector and len(vector) == VECTOR_SIZE:
-        payload = {
-            "title": title,
-            "description": str(desc)[:500] + "...",
-            "rating": float(rating) if rating else 0,
-            "type": str(media_type).split(",")[0].upper(),
-            "image": image
-        }
-        points_batch.append(PointStruct(id=point_id, vector=vector, payload=payload))
-        print(f"   ✅ Prepared: {title}")
-    else:
-        print(f"   ⚠️ PERMANENT FAIL: {title}")
-
-    # 🛑 COOL DOWN: Sleep 0.5s after every movie to be polite
-    time.sleep(0.5)
-
-    if len(points_batch) >= BATCH_SIZE:
-        try:
-            client.upsert(collection_name=COLLECTION_NAME, points=points_batch)
-            total_uploaded += len(points_batch)
-            print(f"🚀 Uploaded batch! Total New: {total_uploaded}")
-            points_batch = []
-            time.sleep(1) # Extra rest after upload
-        except Exception as e:
-            print(f"❌ Batch Upload Failed: {e}")
-            time.sleep(10)
-
-if points_batch:
-    client.upsert(collection_name=COLLECTION_NAME, points=points_batch)
-    total_uploaded += len(points_batch)
+    payload = {
+        "title": title,
+        "description": str(desc)[:500] + "...",
+        "rating": float(rating) if rating else 0,
+        "type": str(media_type).split(",")[0].strip().upper(),
+        "year": int(str(year)[:4]) if str(year)[:4].isdigit() else None,
+        "image": image
+    }
+    pending.append((index, point_id, f"{title} {desc}", payload))
+    pending_ids.add(point_id)  # duplicate titles later in the CSV map to the same id
+
+    if len(pending) >= BATCH_SIZE:
+        flush(pending, index + 1)
+        pending = []
+        pending_ids.clear()
+
+if pending:
+    flush(pending, len(df))
+else:
+    save_checkpoint(len(df) if first_failed_row is None else first_failed_row)
+if total_uploaded: bump_version(client, target)
+if RESET_COLLECTION: swap_alias(client, COLLECTION_NAME, target)  # only now: search never sees a half-filled version
 
-print(f"🎉 DONE! Uploaded: {total_uploaded} | Skipped: {skipped_count}")
\ No newline at end of file
+print(f"🎉 DONE! Uploaded: {total_uploaded} | Skipped: {skipped_count} | Failed: {failed_count}")